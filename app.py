@@ -1,13 +1,27 @@
 import os
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_wtf.csrf import CSRFProtect
 from dotenv import load_dotenv
 
+# Loaded before project modules, some read settings on import
 load_dotenv()
 
-db = SQLAlchemy()
+from database import RoutingSQLAlchemy, engine_options, replica_binds
+from solution_cache import cache
+from hashing import hasher
+from mailer import mail_queue
+import metrics
+
+db = RoutingSQLAlchemy()
+migrate = Migrate()
+
+
+def _int_env(name: str):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
 
 def create_app():
     app = Flask(__name__)
@@ -24,12 +38,92 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = uri
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+    # Connection pool per worker, unset options keep SQLAlchemy's defaults
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+        uri,
+        pool_size=_int_env('DB_POOL_SIZE'),
+        max_overflow=_int_env('DB_MAX_OVERFLOW'),
+        pool_recycle=_int_env('DB_POOL_RECYCLE'),
+        pool_timeout=_int_env('DB_POOL_TIMEOUT'),
+        pool_pre_ping=os.environ.get('DB_POOL_PRE_PING') == '1',
+        statement_timeout=_int_env('DB_STATEMENT_TIMEOUT'),
+    )
+
+    # Comma separated read replicas for read only pages
+    replicas = [
+        r.strip().replace("postgres://", "postgresql://", 1)
+        for r in os.environ.get('DATABASE_REPLICA_URLS', '').split(',')
+        if len(r.strip()) > 0
+    ]
+    app.config['SQLALCHEMY_BINDS'] = replica_binds(replicas)
+    app.config['DATABASE_REPLICAS'] = len(replicas)
+    # Seconds a user's reads stay on primary after they write
+    app.config['REPLICA_PIN_SECONDS'] = float(
+        os.environ.get('REPLICA_PIN_SECONDS', 10)
+    )
+
+    # Solution cache is shared across workers if given a path
+    app.config['SOLUTION_CACHE_PATH'] = os.environ.get('SOLUTION_CACHE_PATH')
+    app.config['SOLUTION_CACHE_SIZE'] = int(
+        os.environ.get('SOLUTION_CACHE_SIZE', 10000)
+    )
+
+    # Seconds to cache users' scores for the navbar
+    app.config['USER_CACHE_TTL'] = float(os.environ.get('USER_CACHE_TTL', 5))
+
+    # Seconds to reuse the leaderboard version before reading it again
+    app.config['LEADERBOARD_STATE_TTL'] = float(
+        os.environ.get('LEADERBOARD_STATE_TTL', 1)
+    )
+
+    # Password hashing pool, workers plus queue should stay below request threads
+    app.config['BCRYPT_ROUNDS'] = int(os.environ.get('BCRYPT_ROUNDS', 12))
+    app.config['BCRYPT_WORKERS'] = int(os.environ.get('BCRYPT_WORKERS', 2))
+    app.config['BCRYPT_MAX_QUEUE'] = int(os.environ.get('BCRYPT_MAX_QUEUE', 2))
+
+    # Largest problem accepted by the bulk grading endpoint
+    app.config['GRADE_MAX_PROCESSES'] = int(
+        os.environ.get('GRADE_MAX_PROCESSES', 1000)
+    )
+    app.config['GRADE_MAX_STEPS'] = int(
+        os.environ.get('GRADE_MAX_STEPS', 200000)
+    )
+
+    # Buffer score increments and write them every SCORE_FLUSH_INTERVAL seconds
+    app.config['SCORE_WRITE_BEHIND'] = os.environ.get('SCORE_WRITE_BEHIND') == '1'
+    app.config['SCORE_FLUSH_INTERVAL'] = float(
+        os.environ.get('SCORE_FLUSH_INTERVAL', 1)
+    )
+
+    # Prometheus metrics and profiler at /metrics, only for these addresses
+    app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '1') == '1'
+    app.config['METRICS_ALLOW'] = [
+        a.strip()
+        for a in os.environ.get('METRICS_ALLOW', '127.0.0.1,::1').split(',')
+        if len(a.strip()) > 0
+    ]
+    app.config['PROFILER_INTERVAL'] = float(
+        os.environ.get('PROFILER_INTERVAL', 0.01)
+    )
+
     db.init_app(app)
+    migrate.init_app(app, db)
+    cache.init_app(app)
+    hasher.init_app(app)
 
     with app.app_context():
         import routes
+        from scores import score_buffer
+        from leaderboard import leaderboard
+        score_buffer.init_app(app)
         CORS(app)
         CSRFProtect(app)
+        metrics.init_app(app, db)
+        metrics.stats.add('solution_cache', cache.stats)
+        metrics.stats.add('hasher', hasher.stats)
+        metrics.stats.add('mail', mail_queue.stats)
+        metrics.stats.add('score_buffer', lambda: {'pending': len(score_buffer.pending)})
+        metrics.stats.add('leaderboard', lambda: {'version': leaderboard.state()[0]})
         return app
 
 
@@ -0,0 +1,299 @@
+from typing import Dict, List, Tuple
+import numpy as np
+from challenge import Problem, SchedulingMethod, Solver
+
+# Arrival time used for padding. Sorts after every real arrival.
+INF = np.iinfo(np.int64).max // 4
+
+# Methods solved with array operations
+ARRAY_METHODS = {
+    SchedulingMethod.FCFS,
+    SchedulingMethod.SJF,
+    SchedulingMethod.SRTF,
+    SchedulingMethod.RR,
+}
+
+
+def pack(problems: List[Problem]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Pack problems into padded arrays
+
+    :param problems: Problems to pack
+    :type problems: List[Problem]
+
+    :return: (arrival times, execution times, quantums, number of processes) arrays.
+        Arrival and execution times are padded to the largest problem with INF and 0.
+    :rtype: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+    """
+    n_problems = len(problems)
+    n_processes = np.array([len(p.times) for p in problems], dtype=np.int64)
+    width = int(n_processes.max()) if n_problems > 0 else 0
+
+    arrivals = np.full((n_problems, width), INF, dtype=np.int64)
+    execs = np.zeros((n_problems, width), dtype=np.int64)
+    for i, problem in enumerate(problems):
+        if len(problem.times) > 0:
+            times = np.array(problem.times, dtype=np.int64)
+            arrivals[i, :len(times)] = times[:, 0]
+            execs[i, :len(times)] = times[:, 1]
+    quantums = np.array([p.quantum for p in problems], dtype=np.int64)
+
+    return arrivals, execs, quantums, n_processes
+
+
+def solve_batch(problems: List[Problem]) -> List[List[Tuple[int, int]]]:
+    """Solves finish and wait times for many problems at once
+
+    Problems are grouped by scheduling method and each FCFS, SJF, SRTF and
+    RR group is solved with array operations over the whole group. Problems
+    of other methods are solved one at a time with `Solver`. Results match
+    `Solver.solve`.
+
+    :param problems: Problems to solve
+    :type problems: List[Problem]
+
+    :return: List of (finish time, wait time) pairs for each problem
+    :rtype: List[List[Tuple[int, int]]]
+    """
+    groups: Dict[SchedulingMethod, List[int]] = {}
+    for i, problem in enumerate(problems):
+        groups.setdefault(SchedulingMethod(problem.method), []).append(i)
+
+    res = [None] * len(problems)
+    for method, idxs in groups.items():
+        if method not in ARRAY_METHODS:
+            for i in idxs:
+                res[i] = Solver(problems[i]).solve()
+            continue
+
+        arrivals, execs, quantums, n_processes = pack(
+            [problems[i] for i in idxs]
+        )
+
+        if method == SchedulingMethod.FCFS:
+            finish = _solve_fcfs(arrivals, execs)
+        elif method == SchedulingMethod.SJF:
+            finish = _solve_sjf(arrivals, execs, n_processes)
+        elif method == SchedulingMethod.SRTF:
+            finish = _solve_srtf(arrivals, execs, n_processes)
+        elif method == SchedulingMethod.RR:
+            # Matches Solver, smaller quantums would never use up a time slice
+            if len(quantums) > 0 and quantums.min() < 1:
+                raise Exception('quantum must be at least 1')
+            finish = _solve_rr(arrivals, execs, quantums, n_processes)
+        else:
+            raise Exception('invalid scheduling method')
+
+        wait = finish - arrivals - execs
+        for row, i in enumerate(idxs):
+            n = n_processes[row]
+            res[i] = list(zip(finish[row, :n].tolist(), wait[row, :n].tolist()))
+
+    return res
+
+
+def _arrival_order(arrivals: np.ndarray) -> np.ndarray:
+    """Process indices in order of arrival, ties broken by process index
+    """
+    return np.argsort(arrivals, axis=1, kind='stable')
+
+
+def _solve_fcfs(arrivals: np.ndarray, execs: np.ndarray) -> np.ndarray:
+    """Solves finish times using first come, first served
+
+    Finish time of the k-th arrival is max(previous finish, arrival) + execution
+    time, which unrolls to a running maximum over prefix sums.
+    """
+    order = _arrival_order(arrivals)
+    a = np.take_along_axis(arrivals, order, axis=1)
+    x = np.take_along_axis(execs, order, axis=1)
+
+    total = np.cumsum(x, axis=1)
+    finish_sorted = total + np.maximum.accumulate(a - (total - x), axis=1)
+
+    finish = np.zeros_like(finish_sorted)
+    np.put_along_axis(finish, order, finish_sorted, axis=1)
+    return finish
+
+
+def _solve_sjf(arrivals: np.ndarray, execs: np.ndarray, n_processes: np.ndarray) -> np.ndarray:
+    """Solves finish times using shortest job first
+
+    Each step runs one process to completion in every problem.
+    """
+    n_problems, width = arrivals.shape
+    rows = np.arange(n_problems)
+    cols = np.arange(width)
+    done = cols[None, :] >= n_processes[:, None]
+    finish = np.zeros_like(arrivals)
+    curr_t = np.zeros(n_problems, dtype=np.int64)
+
+    for step in range(width):
+        active = step < n_processes
+        # Shortest job among arrived, otherwise next arrival if idle
+        arrived = ~done & (arrivals <= curr_t[:, None])
+        is_busy = arrived.any(axis=1) & (step > 0)
+        shortest = np.argmin(np.where(arrived, execs, INF), axis=1)
+        next_arrival = np.argmin(np.where(done, INF, arrivals), axis=1)
+        p = np.where(is_busy, shortest, next_arrival)
+
+        start_t = np.where(is_busy, curr_t, arrivals[rows, p])
+        curr_t = np.where(active, start_t + execs[rows, p], curr_t)
+
+        r = rows[active]
+        finish[r, p[active]] = curr_t[active]
+        done[r, p[active]] = True
+
+    return finish
+
+
+def _solve_srtf(arrivals: np.ndarray, execs: np.ndarray, n_processes: np.ndarray) -> np.ndarray:
+    """Solves finish times using shortest remaining time first
+
+    Each step handles the next arrival or finish in every problem.
+    """
+    n_problems, width = arrivals.shape
+    order = _arrival_order(arrivals)
+    sorted_arrivals = np.concatenate([
+        np.take_along_axis(arrivals, order, axis=1),
+        np.full((n_problems, 1), INF, dtype=np.int64),
+    ], axis=1)
+    order = np.concatenate([order, np.zeros((n_problems, 1), dtype=order.dtype)], axis=1)
+
+    time_left = execs.copy()
+    ready = np.zeros((n_problems, width), dtype=bool)
+    finish = np.zeros_like(arrivals)
+    curr_t = np.zeros(n_problems, dtype=np.int64)
+    curr_p = np.full(n_problems, -1, dtype=np.int64)
+    n_arrived = np.zeros(n_problems, dtype=np.int64)
+    n_finished = np.zeros(n_problems, dtype=np.int64)
+
+    while True:
+        active = n_finished < n_processes
+        if not active.any():
+            break
+
+        # Fast forward to next arrival if none pending
+        idle = active & (curr_p < 0)
+        r = np.nonzero(idle)[0]
+        curr_p[r] = order[r, n_arrived[r]]
+        curr_t[r] = sorted_arrivals[r, n_arrived[r]]
+        n_arrived[r] += 1
+
+        # Find next event time
+        r = np.nonzero(active & ~idle)[0]
+        next_arrival_t = sorted_arrivals[r, n_arrived[r]]
+        finish_curr_t = curr_t[r] + time_left[r, curr_p[r]]
+        is_arrival = next_arrival_t <= finish_curr_t
+
+        # Next event is process arrival
+        a = r[is_arrival]
+        time_left[a, curr_p[a]] -= next_arrival_t[is_arrival] - curr_t[a]
+        curr_t[a] = next_arrival_t[is_arrival]
+        new_p = order[a, n_arrived[a]]
+        n_arrived[a] += 1
+        is_switch = time_left[a, new_p] < time_left[a, curr_p[a]]
+        ready[a, np.where(is_switch, curr_p[a], new_p)] = True
+        curr_p[a] = np.where(is_switch, new_p, curr_p[a])
+
+        # Next event is process finish
+        f = r[~is_arrival]
+        curr_t[f] = finish_curr_t[~is_arrival]
+        time_left[f, curr_p[f]] = 0
+        finish[f, curr_p[f]] = curr_t[f]
+        n_finished[f] += 1
+        has_ready = ready[f].any(axis=1)
+        next_p = np.argmin(np.where(ready[f], time_left[f], INF), axis=1)
+        ready[f[has_ready], next_p[has_ready]] = False
+        curr_p[f] = np.where(has_ready, next_p, -1)
+
+    return finish
+
+
+def _solve_rr(arrivals: np.ndarray, execs: np.ndarray, quantums: np.ndarray, n_processes: np.ndarray) -> np.ndarray:
+    """Solves finish times using round robin
+
+    Each step handles the next arrival, finish or time up in every problem.
+    Ready queues are circular buffers with one row per problem.
+    """
+    n_problems, width = arrivals.shape
+    order = _arrival_order(arrivals)
+    sorted_arrivals = np.concatenate([
+        np.take_along_axis(arrivals, order, axis=1),
+        np.full((n_problems, 1), INF, dtype=np.int64),
+    ], axis=1)
+    order = np.concatenate([order, np.zeros((n_problems, 1), dtype=order.dtype)], axis=1)
+
+    capacity = max(width, 1)
+    queue = np.zeros((n_problems, capacity), dtype=np.int64)
+    queue_head = np.zeros(n_problems, dtype=np.int64)
+    queue_size = np.zeros(n_problems, dtype=np.int64)
+
+    time_left = execs.copy()
+    time_remaining = quantums.copy()
+    finish = np.zeros_like(arrivals)
+    curr_t = np.zeros(n_problems, dtype=np.int64)
+    curr_p = np.full(n_problems, -1, dtype=np.int64)
+    n_arrived = np.zeros(n_problems, dtype=np.int64)
+    n_finished = np.zeros(n_problems, dtype=np.int64)
+
+    def push(r, p):
+        queue[r, (queue_head[r] + queue_size[r]) % capacity] = p
+        queue_size[r] += 1
+
+    def pop(r):
+        p = queue[r, queue_head[r]]
+        queue_head[r] = (queue_head[r] + 1) % capacity
+        queue_size[r] -= 1
+        return p
+
+    while True:
+        active = n_finished < n_processes
+        if not active.any():
+            break
+
+        # Fast forward to next arrival if none pending
+        idle = active & (curr_p < 0)
+        r = np.nonzero(idle)[0]
+        curr_p[r] = order[r, n_arrived[r]]
+        curr_t[r] = sorted_arrivals[r, n_arrived[r]]
+        n_arrived[r] += 1
+
+        # Find next event time
+        r = np.nonzero(active & ~idle)[0]
+        next_arrival_t = sorted_arrivals[r, n_arrived[r]]
+        finish_curr_t = curr_t[r] + time_left[r, curr_p[r]]
+        time_up_t = curr_t[r] + time_remaining[r]
+        next_t = np.minimum(np.minimum(next_arrival_t, finish_curr_t), time_up_t)
+
+        # Update times
+        dt = next_t - curr_t[r]
+        time_left[r, curr_p[r]] -= dt
+        curr_t[r] = next_t
+        time_remaining[r] -= dt
+
+        is_arrival = next_t == next_arrival_t
+        is_finish = ~is_arrival & (next_t == finish_curr_t)
+        is_time_up = ~is_arrival & ~is_finish
+
+        # Next event is process arrival
+        a = r[is_arrival]
+        push(a, order[a, n_arrived[a]])
+        n_arrived[a] += 1
+
+        # Next event is process finish
+        f = r[is_finish]
+        time_remaining[f] = quantums[f]
+        finish[f, curr_p[f]] = curr_t[f]
+        n_finished[f] += 1
+        has_ready = queue_size[f] > 0
+        curr_p[f[~has_ready]] = -1
+        f = f[has_ready]
+        curr_p[f] = pop(f)
+
+        # Next event is time up
+        u = r[is_time_up]
+        time_remaining[u] = quantums[u]
+        push(u, curr_p[u])
+        curr_p[u] = pop(u)
+
+    return finish
@@ -0,0 +1,241 @@
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+from challenge import QUANTUM_METHODS, Problem, SchedulingMethod, Solver
+from workloads import ExponentialArrivals, UniformExecTimes, Workload
+
+DEFAULT_SIZES = [3, 10, 100, 1000, 10000, 100000]
+DEFAULT_QUANTA = [2, 5, 20]
+TIMED_FIELDS = ['generate_s', 'unique_generate_s', 'solve_s', 'logger_solve_s', 'token_roundtrip_s']
+
+# Sizes of problems served to users, generated with `unique=True`
+MIN_SERVED_SIZE = 3
+MAX_SERVED_SIZE = 10
+
+# Bounded execution times keep total work linear in the number of processes,
+# so timings show how solvers scale rather than how the workload grows
+WORKLOAD_NAME = 'bounded'
+WORKLOAD = Workload(ExponentialArrivals(mean_gap=6.0), UniformExecTimes(1, 10))
+
+
+def time_call(f: Callable[[], object], repeat: int) -> Tuple[float, object]:
+    """Times function
+
+    The fastest run is reported, since slower runs mostly measure noise
+    such as garbage collection and scheduling.
+
+    :return: (fastest seconds, last return value) pair
+    :rtype: Tuple[float, object]
+    """
+    times = []
+    res = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        res = f()
+        times.append(time.perf_counter() - start)
+    return min(times), res
+
+
+def bench_case(method: SchedulingMethod, n_processes: int, quantum: int, seed: int, repeat: int) -> Dict:
+    """Benchmarks generating and solving one problem size
+
+    :return: Benchmark result
+    :rtype: Dict
+    """
+    rng = random.Random(seed)
+    generate_s, problem = time_call(
+        lambda: Problem.generate_workload(
+            method, n_processes, WORKLOAD,
+            min_quantum=quantum, max_quantum=quantum, rng=rng,
+        ),
+        repeat,
+    )
+
+    res = {
+        'method': method.value,
+        'workload': WORKLOAD_NAME,
+        'quantum': quantum if method in QUANTUM_METHODS else 0,
+        'n_processes': n_processes,
+        'generate_s': generate_s,
+    }
+    if MIN_SERVED_SIZE <= n_processes <= MAX_SERVED_SIZE:
+        res['unique_generate_s'], _ = time_call(
+            lambda: Problem.generate(
+                method, n_processes,
+                min_quantum=quantum, max_quantum=quantum, rng=rng, unique=True,
+            ),
+            repeat,
+        )
+
+    # Solver.solve includes EventLogger.solve, which is timed again on its own
+    solvers = []
+
+    def solve():
+        solver = Solver(problem)
+        solver.solve()
+        solvers.append(solver)
+
+    solve_s, _ = time_call(solve, repeat)
+    logger_solve_s, _ = time_call(solvers[-1].logger.solve, repeat)
+
+    # Session encodings
+    json_roundtrip_s, _ = time_call(
+        lambda: Problem.from_json(problem.to_json()), repeat
+    )
+    token_roundtrip_s, _ = time_call(
+        lambda: Problem.from_token(problem.to_token()), repeat
+    )
+
+    tracemalloc.start()
+    Solver(problem).solve()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    res.update({
+        'solve_s': solve_s,
+        'logger_solve_s': logger_solve_s,
+        'peak_bytes': peak_bytes,
+        'json_roundtrip_s': json_roundtrip_s,
+        'token_roundtrip_s': token_roundtrip_s,
+        'json_bytes': len(problem.to_json()),
+        'token_bytes': len(problem.to_token()),
+    })
+    return res
+
+
+def run(methods: List[SchedulingMethod], sizes: List[int], quanta: List[int], seed: int, repeat: int, budget: float) -> List[Dict]:
+    """Runs benchmark sweep
+
+    Larger sizes of a method and quantum are skipped once solving is
+    estimated to take longer than `budget` seconds. Estimates extrapolate the
+    growth between the last two sizes, at least linearly.
+
+    :return: Benchmark results
+    :rtype: List[Dict]
+    """
+    results = []
+    for method in methods:
+        for quantum in (quanta if method in QUANTUM_METHODS else [0]):
+            prev = None
+            growth = 1.0
+            for n_processes in sorted(sizes):
+                if prev != None and prev['solve_s'] * (n_processes / prev['n_processes']) ** growth > budget:
+                    print(
+                        f"{method.value:>4} q={quantum:<3} n={n_processes:<7} skipped",
+                        file=sys.stderr,
+                    )
+                    break
+
+                res = bench_case(method, n_processes, quantum, seed, repeat)
+                results.append(res)
+                print(
+                    f"{res['method']:>4} q={res['quantum']:<3} n={n_processes:<7} "
+                    f"generate={res['generate_s']:.6f}s "
+                    + (f"unique_generate={res['unique_generate_s']:.6f}s " if 'unique_generate_s' in res else '')
+                    + f"solve={res['solve_s']:.6f}s "
+                    f"logger_solve={res['logger_solve_s']:.6f}s peak={res['peak_bytes']}B "
+                    f"token={res['token_bytes']}B/{res['token_roundtrip_s']:.6f}s "
+                    f"json={res['json_bytes']}B/{res['json_roundtrip_s']:.6f}s",
+                    file=sys.stderr,
+                )
+                if prev != None and prev['solve_s'] > 0 and res['solve_s'] > 0:
+                    growth = max(1.0, math.log(res['solve_s'] / prev['solve_s']) / math.log(n_processes / prev['n_processes']))
+                prev = res
+    return results
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float, min_delta: float) -> List[str]:
+    """Compares results against baseline
+
+    :return: Descriptions of timings slower than baseline by more than
+        `tolerance` and more than `min_delta` seconds
+    :rtype: List[str]
+    """
+    # Results from other workloads are not comparable
+    def key(res): return (res['method'], res.get('workload'), res['quantum'], res['n_processes'])
+    baseline = {key(res): res for res in baseline}
+
+    regressions = []
+    for res in results:
+        base = baseline.get(key(res))
+        if base == None:
+            continue
+        for field in TIMED_FIELDS:
+            if field not in base or field not in res:
+                continue
+            if res[field] > base[field] * (1 + tolerance) and res[field] - base[field] > min_delta:
+                regressions.append(
+                    f"{res['method']} q={res['quantum']} n={res['n_processes']} {field}: "
+                    f"{base[field]:.6f}s -> {res[field]:.6f}s "
+                    f"({res[field] / base[field] - 1:+.0%})"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark problem generation and solving',
+    )
+    parser.add_argument('-o', '--output', default='-',
+                        help='output JSON file (default: stdout)')
+    parser.add_argument('--methods', default=','.join(m.value for m in SchedulingMethod),
+                        help='comma separated methods (default: all)')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='comma separated process counts')
+    parser.add_argument('--quanta', default=','.join(map(str, DEFAULT_QUANTA)),
+                        help='comma separated RR quanta')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='random seed (default: 0)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='runs per timing, fastest is reported (default: 5)')
+    parser.add_argument('--budget', type=float, default=10.0,
+                        help='skip sizes estimated to take longer than this many seconds to solve (default: 10)')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='baseline JSON file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown against baseline (default: 0.2)')
+    parser.add_argument('--min-delta', type=float, default=0.0005,
+                        help='ignore slowdowns smaller than this many seconds (default: 0.0005)')
+    args = parser.parse_args()
+
+    methods = [SchedulingMethod(m.strip().upper()) for m in args.methods.split(',')]
+    sizes = [int(n) for n in args.sizes.split(',')]
+    quanta = [int(q) for q in args.quanta.split(',')]
+
+    results = run(methods, sizes, quanta, args.seed, args.repeat, args.budget)
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'results': results,
+    }
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        json.dump(report, out, indent=2)
+        out.write('\n')
+    finally:
+        if out != sys.stdout:
+            out.close()
+
+    if args.compare != None:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(
+            results, baseline, args.tolerance, args.min_delta
+        )
+        for line in regressions:
+            print(f'REGRESSION {line}', file=sys.stderr)
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
 import random
 import enum
 import json
-from typing import List, Tuple
+import base64
+import binascii
+import heapq
+import bisect
+from array import array
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Type
+from metrics import timed
 
 
 class SchedulingMethod(str, enum.Enum):
@@ -11,13 +18,99 @@ class SchedulingMethod(str, enum.Enum):
     SJF = 'SJF'  # Shortest job first
     SRTF = 'SRTF'  # Shortest remaining job first
     RR = 'RR'  # Round robin
+    NPP = 'NPP'  # Non-preemptive priority
+    PP = 'PP'  # Preemptive priority
+    HRRN = 'HRRN'  # Highest response ratio next
+    MLFQ = 'MLFQ'  # Multilevel feedback queue
+    LOTTERY = 'LOTTERY'  # Lottery
+
+
+# Methods served as challenges and supported by the batch solver
+BASIC_METHODS = [
+    SchedulingMethod.FCFS,
+    SchedulingMethod.SJF,
+    SchedulingMethod.SRTF,
+    SchedulingMethod.RR,
+]
+
+# Methods that use the problem's quantum
+QUANTUM_METHODS = {
+    SchedulingMethod.RR,
+    SchedulingMethod.MLFQ,
+    SchedulingMethod.LOTTERY,
+}
+
+# Methods that use the problem's priorities
+PRIORITY_METHODS = {
+    SchedulingMethod.NPP,
+    SchedulingMethod.PP,
+    SchedulingMethod.LOTTERY,
+}
+
+# Version byte of problem tokens, bump when the encoding changes. Problems
+# without priorities are still encoded as version 1.
+TOKEN_VERSION = 2
+
+# Method of each code in problem tokens, append only
+TOKEN_METHODS = [
+    SchedulingMethod.FCFS,
+    SchedulingMethod.SJF,
+    SchedulingMethod.SRTF,
+    SchedulingMethod.RR,
+    SchedulingMethod.NPP,
+    SchedulingMethod.PP,
+    SchedulingMethod.HRRN,
+    SchedulingMethod.MLFQ,
+    SchedulingMethod.LOTTERY,
+]
+
+
+def _encode_varints(values: List[int]) -> bytes:
+    """Encodes non-negative integers as LEB128 varints
+    """
+    if min(values) < 0:
+        raise Exception('cannot encode negative value')
+    if max(values) < 0x80:
+        # One byte each
+        return bytes(values)
+
+    buf = bytearray()
+    for v in values:
+        while v >= 0x80:
+            buf.append((v & 0x7f) | 0x80)
+            v >>= 7
+        buf.append(v)
+    return bytes(buf)
+
+
+def _decode_varints(data: bytes) -> List[int]:
+    """Decodes LEB128 varints
+    """
+    if len(data) == 0 or max(data) < 0x80:
+        # One byte each
+        return list(data)
+
+    values = []
+    v = 0
+    shift = 0
+    for b in data:
+        v |= (b & 0x7f) << shift
+        if b & 0x80:
+            shift += 7
+        else:
+            values.append(v)
+            v = 0
+            shift = 0
+    if shift != 0:
+        raise Exception('truncated varint')
+    return values
 
 
 class Problem:
     """Process scheduling problem
     """
 
-    def __init__(self, method: SchedulingMethod, times: List[Tuple[int, int]], quantum: int = 0):
+    def __init__(self, method: SchedulingMethod, times: List[Tuple[int, int]], quantum: int = 0, priorities: List[int] = None):
         """
         :param method: Process scheduling method
         :type method: SchedulingMethod
@@ -25,27 +118,120 @@ class Problem:
         :param times: List of (arrival time, execution time) pairs for each process
         :type times: List[Tuple[int, int]]
 
-        :param quantum: Quantum for RR problem. Ignored if not RR problem.
+        :param quantum: Quantum for RR and LOTTERY problems and quantum of the
+            top MLFQ level. Ignored by other methods.
         :type quantum: int
+
+        :param priorities: Priority of each process, lower runs first. Also
+            gives LOTTERY processes more tickets. Ignored by other methods.
+        :type priorities: List[int]
         """
         self.method = method
         self.times = times
         self.quantum = quantum
+        self.priorities = priorities
 
     @staticmethod
-    def generate(method: SchedulingMethod, n_processes: int, max_time: int = 20, min_quantum: int = 2, max_quantum: int = 5) -> "Problem":
+    @timed('problem.generate')
+    def generate(method: SchedulingMethod, n_processes: int, max_time: int = 20, min_quantum: int = 2, max_quantum: int = 5, rng: random.Random = None, unique: bool = False, max_attempts: int = 1000, max_priority: int = 5) -> "Problem":
         """Generate random problem
+
+        :param rng: Random number generator to draw from. Defaults to the global one.
+        :type rng: random.Random
+
+        :param unique: Whether to resample until the problem has no tie points
+        :type unique: bool
+
+        :param max_attempts: Number of samples to try if `unique` is set
+        :type max_attempts: int
+
+        :param max_priority: Max priority for methods that use priorities
+        :type max_priority: int
         """
-        arrival_times = random.sample(range(1, max_time), n_processes)
-        exec_times = [random.randint(1, t) for t in arrival_times]
-        times = [(t1, t2) for t1, t2 in zip(arrival_times, exec_times)]
+        if rng == None:
+            rng = random
 
-        # TODO: check if problem is uniquely solvable
-        if method == SchedulingMethod.RR:
-            quantum = random.randint(min_quantum, max_quantum)
-            return Problem(method, times, quantum=quantum)
-        else:
-            return Problem(method, times)
+        for _ in range(max_attempts):
+            arrival_times = rng.sample(range(1, max_time), n_processes)
+            exec_times = [rng.randint(1, t) for t in arrival_times]
+            times = [(t1, t2) for t1, t2 in zip(arrival_times, exec_times)]
+
+            if method in QUANTUM_METHODS:
+                quantum = rng.randint(min_quantum, max_quantum)
+                problem = Problem(method, times, quantum=quantum)
+            else:
+                problem = Problem(method, times)
+            if method in PRIORITY_METHODS:
+                problem.priorities = [rng.randint(1, max_priority) for _ in times]
+
+            if not unique or len(find_ties(problem, first_only=True)) == 0:
+                return problem
+
+        raise Exception('could not generate uniquely solvable problem')
+
+    @staticmethod
+    @timed('problem.generate')
+    def generate_workload(method: SchedulingMethod, n_processes: int, workload, min_quantum: int = 2, max_quantum: int = 5, rng: random.Random = None, unique: bool = False, max_attempts: int = 1000, max_priority: int = 5) -> "Problem":
+        """Generate problem from a workload
+
+        Processes are numbered in arrival order. Arrivals and execution times
+        are streamed from the workload, so there is no limit on the number of
+        processes and arrival times may repeat.
+
+        :param workload: Workload to draw from, e.g. one of `workloads.WORKLOADS`
+        :type workload: workloads.Workload
+
+        :param rng: Random number generator to draw from. Defaults to the global one.
+        :type rng: random.Random
+
+        :param unique: Whether to resample until the problem has no tie points
+        :type unique: bool
+
+        :param max_attempts: Number of samples to try if `unique` is set
+        :type max_attempts: int
+
+        :param max_priority: Max priority for methods that use priorities
+        :type max_priority: int
+        """
+        if rng == None:
+            rng = random
+
+        for _ in range(max_attempts):
+            quantum = 0
+            if method in QUANTUM_METHODS:
+                quantum = rng.randint(min_quantum, max_quantum)
+            times = list(workload.stream(n_processes, rng))
+            problem = Problem(method, times, quantum=quantum)
+            if method in PRIORITY_METHODS:
+                problem.priorities = [rng.randint(1, max_priority) for _ in times]
+
+            if not unique or len(find_ties(problem, first_only=True)) == 0:
+                return problem
+
+        raise Exception('could not generate uniquely solvable problem')
+
+    @staticmethod
+    def from_seed(seed: int, method: SchedulingMethod = None, n_processes: int = 3, **kwargs) -> "Problem":
+        """Generate problem determined by seed
+
+        Draws from its own random number generator, so a seed gives the same
+        problem on every node without storing it.
+
+        :param seed: 64-bit unsigned seed
+        :type seed: int
+
+        :param method: Process scheduling method. Drawn from `BASIC_METHODS` if None.
+        :type method: SchedulingMethod
+
+        :param kwargs: Other arguments of `generate`
+        """
+        if seed < 0 or seed >= 1 << 64:
+            raise Exception('seed must be a 64-bit unsigned integer')
+
+        rng = random.Random(seed)
+        if method == None:
+            method = rng.choice(BASIC_METHODS)
+        return Problem.generate(method, n_processes, rng=rng, **kwargs)
 
     @staticmethod
     def from_json(payload: str) -> "Problem":
@@ -53,23 +239,198 @@ class Problem:
         method = data['method']
         times = data['times']
         quantum = data['quantum']
-        return Problem(method=method, times=times, quantum=quantum)
+        priorities = data.get('priorities')
+        return Problem(method=method, times=times, quantum=quantum, priorities=priorities)
 
-    def to_json(self) -> str:
-        return json.dumps({
+    def to_dict(self) -> dict:
+        data = {
             'method': self.method,
             'times': self.times,
             'quantum': self.quantum,
-        })
+        }
+        if self.priorities != None:
+            data['priorities'] = self.priorities
+        return data
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    @staticmethod
+    def from_bytes(data: bytes) -> "Problem":
+        """Decodes problem encoded by `to_bytes`
+        """
+        if len(data) == 0 or data[0] not in (1, 2):
+            raise Exception('unsupported problem token version')
+        values = _decode_varints(data[1:])
+        if len(values) < 3:
+            raise Exception('invalid problem token')
+        method_code, quantum, n = values[:3]
+        n_priorities = n if data[0] == 2 else 0
+        if len(values) != 3 + 2 * n + n_priorities or method_code >= len(TOKEN_METHODS):
+            raise Exception('invalid problem token')
+        times = list(zip(values[3:3+2*n:2], values[4:3+2*n:2]))
+        priorities = values[3+2*n:] if data[0] == 2 else None
+        return Problem(TOKEN_METHODS[method_code], times, quantum=quantum, priorities=priorities)
+
+    def to_bytes(self) -> bytes:
+        """Encodes problem as a version byte followed by varints of method,
+        quantum, number of processes, each process' times and, in version 2,
+        each process' priority
+        """
+        values = [TOKEN_METHODS.index(self.method), self.quantum, len(self.times)]
+        for arrival_t, exec_t in self.times:
+            values.append(arrival_t)
+            values.append(exec_t)
+        if self.priorities == None:
+            return bytes([1]) + _encode_varints(values)
+        values.extend(self.priorities)
+        return bytes([TOKEN_VERSION]) + _encode_varints(values)
+
+    @staticmethod
+    def from_token(token: str) -> "Problem":
+        """Decodes problem encoded by `to_token`
+        """
+        try:
+            data = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        except (binascii.Error, ValueError):
+            raise Exception('invalid problem token')
+        return Problem.from_bytes(data)
+
+    def to_token(self) -> str:
+        """Encodes problem as unpadded URL safe base64 of `to_bytes`
+        """
+        return base64.urlsafe_b64encode(self.to_bytes()).rstrip(b'=').decode('ascii')
+
+
+class EventLog:
+    """Compact event log
+
+    Events are stored as columns of sparse (process, time left) entries, so
+    memory is proportional to the number of logged state changes.
+    """
+    __slots__ = ('n_processes', 'times', 'offsets', 'processes', 'time_lefts')
+
+    def __init__(self, n_processes: int):
+        """
+        :param n_processes: Number of processes
+        :type n_processes: int
+        """
+        self.n_processes = n_processes
+        self.times = array('q')  # Time of each event
+        self.offsets = array('q', [0])  # Start of each event's entries
+        self.processes = array('q')  # Process of each entry
+        self.time_lefts = array('q')  # Time left of each entry
+
+    def append(self, time: int, state: Dict[int, int]):
+        """Append event
+
+        :param time: Time event occured
+        :type time: int
+
+        :param state: Time left for each process logged in event
+        :type state: Dict[int, int]
+        """
+        self.times.append(time)
+        self.processes.extend(state.keys())
+        self.time_lefts.extend(state.values())
+        self.offsets.append(len(self.processes))
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def __getitem__(self, idx: int) -> Tuple[int, Dict[int, int]]:
+        """Get event
+
+        :param idx: Index of event
+        :type idx: int
+
+        :return: (time, {process: time left}) pair
+        :rtype: Tuple[int, Dict[int, int]]
+        """
+        if idx < 0:
+            idx += len(self.times)
+        if idx < 0 or idx >= len(self.times):
+            raise IndexError('event index out of range')
+        lo = self.offsets[idx]
+        hi = self.offsets[idx+1]
+        return self.times[idx], dict(zip(self.processes[lo:hi], self.time_lefts[lo:hi]))
+
+    def __iter__(self) -> Iterator[Tuple[int, Dict[int, int]]]:
+        for idx in range(len(self.times)):
+            yield self[idx]
+
+    def state_at(self, time: int) -> List[Optional[int]]:
+        """Reconstruct state as of the last event at or before a point in time
+
+        :param time: Point in time
+        :type time: int
+
+        :return: Last logged time left for each process or None if not logged yet
+        :rtype: List[Optional[int]]
+        """
+        state = [None] * self.n_processes
+        end = self.offsets[bisect.bisect_right(self.times, time)]
+        for p, time_left in zip(self.processes[:end], self.time_lefts[:end]):
+            state[p] = time_left
+        return state
+
+    def dense(self) -> List[Tuple[int, List[Optional[int]]]]:
+        """Expand log into (time, state) pairs with an entry for every process
+
+        :return: List of (time, state) pairs
+        :rtype: List[Tuple[int, List[Optional[int]]]]
+        """
+        res = []
+        for t, entries in self:
+            state = [None] * self.n_processes
+            for p, time_left in entries.items():
+                state[p] = time_left
+            res.append((t, state))
+        return res
+
+    def solve(self) -> List[Tuple[int, int]]:
+        """Solve finish and wait times by replaying log
+
+        :return: List of (finish time, wait time) pairs
+        :rtype: List[Tuple[int, int]]
+        """
+        logger = EventLogger(self.n_processes)
+        for t, entries in self:
+            logger.begin_event(t)
+            for p, time_left in entries.items():
+                logger.add(p, time_left)
+            logger.end_event()
+        return logger.solve()
 
 
 class EventLogger:
     """Event logger
+
+    Finish and wait times are accumulated as each event is committed, so
+    solving needs O(n) memory. The full event log is only kept if requested.
     """
 
-    def __init__(self, n_processes: int):
+    def __init__(self, n_processes: int, keep_events: bool = False):
+        """
+        :param n_processes: Number of processes
+        :type n_processes: int
+
+        :param keep_events: Whether to keep the full event log in `events`
+        :type keep_events: bool
+        """
         self.n_processes = n_processes
-        self.events = []
+        self.keep_events = keep_events
+        self.events = EventLog(n_processes)
+
+        self.n_events = 0
+        self.last_t = None
+        # Per process accumulators
+        self.start_t = [None] * n_processes  # Time first logged
+        self.finish_t = [0] * n_processes  # Last time logged as done
+        self.done_t = [None] * n_processes  # First time logged as done
+        self.run_t = [0] * n_processes  # Time spent running before done
+        self.last_event = [-1] * n_processes  # Index of last event logged in
+        self.last_time_left = [None] * n_processes
 
     def begin_event(self, time: int):
         """Begin event at a point in time
@@ -78,12 +439,34 @@ class EventLogger:
         :type time: int
         """
         self.curr_t = time
-        self.curr_state = [None] * self.n_processes
+        self.curr_state = {}
 
     def end_event(self):
         """End and commit current event
         """
-        self.events.append((self.curr_t, self.curr_state))
+        t = self.curr_t
+        idx = self.n_events
+
+        for p, time_left in self.curr_state.items():
+            if self.start_t[p] == None:
+                self.start_t[p] = t
+            elif self.last_event[p] == idx - 1 and self.last_time_left[p] != time_left and self.done_t[p] == None:
+                # Running if time left changes between consecutive events
+                self.run_t[p] += t - self.last_t
+
+            if time_left == 0:
+                self.finish_t[p] = t
+                if self.done_t[p] == None:
+                    self.done_t[p] = t
+
+            self.last_event[p] = idx
+            self.last_time_left[p] = time_left
+
+        if self.keep_events:
+            self.events.append(t, self.curr_state)
+
+        self.n_events += 1
+        self.last_t = t
 
     def add(self, process: int, time_left: int):
         """Add processes to current event
@@ -97,66 +480,464 @@ class EventLogger:
         self.curr_state[process] = time_left
 
     def solve(self) -> List[Tuple[int, int]]:
-        """Solve finish and wait times from event log
+        """Solve finish and wait times from committed events
+
+        A process waits from the first event it is logged in until it is done,
+        except between consecutive events where its time left changes.
 
         :return: List of (finish time, wait time) pairs
         :rtype: List[Tuple[int, int]]
         """
-        events = self.events
-        n_processes = self.n_processes
+        res = [None] * self.n_processes
+        for p in range(self.n_processes):
+            start_t = self.start_t[p]
+            if start_t == None:
+                res[p] = (self.finish_t[p], 0)
+                continue
 
-        res = [None] * n_processes
-        for p in range(n_processes):
+            end_t = self.done_t[p] if self.done_t[p] != None else self.last_t
+            res[p] = (self.finish_t[p], end_t - start_t - self.run_t[p])
 
-            # Find finish time
-            finish_t = 0
-            for t, state in events:
-                if state[p] == 0:
-                    finish_t = t
+        return res
 
-            # Find wait time
-            wait_t = 0
-            start_idx = 0
-            while events[start_idx][1][p] == None:
-                start_idx += 1
 
-            for i in range(start_idx, len(events)-1):
-                t, state = events[i]
-                next_t, next_state = events[i+1]
+class Timeline:
+    """Execution timeline as segments of which process ran when
 
-                # Exit if already done
-                if state[p] == 0:
-                    break
+    Segments are stored as columns and a process running on past its time
+    slice extends its last segment, so size is proportional to the number of
+    context switches. Times with no segment are idle.
+    """
+    __slots__ = ('processes', 'starts', 'ends')
 
-                # Not waiting if time left between events is not null and changes
-                if state[p] != None and next_state[p] != None and state[p] != next_state[p]:
-                    continue
-                else:
-                    wait_t += next_t - t
-            res[p] = (finish_t, wait_t)
+    def __init__(self):
+        self.processes = array('q')  # Process of each segment
+        self.starts = array('q')  # Start time of each segment
+        self.ends = array('q')  # End time of each segment
+
+    def add(self, process: int, start: int, end: int):
+        """Add segment of process running from start to end
+        """
+        if start == end:
+            return
+        n = len(self.processes)
+        if n > 0 and self.processes[n-1] == process and self.ends[n-1] == start:
+            self.ends[n-1] = end
+            return
+        self.processes.append(process)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def __len__(self) -> int:
+        return len(self.processes)
+
+    def __getitem__(self, idx: int) -> Tuple[int, int, int]:
+        return self.processes[idx], self.starts[idx], self.ends[idx]
+
+    def __iter__(self) -> Iterator[Tuple[int, int, int]]:
+        """Iterate over (process, start time, end time) segments in time order
+        """
+        return zip(self.processes, self.starts, self.ends)
+
+    def to_list(self) -> List[Tuple[int, int, int]]:
+        """List of (process, start time, end time) segments
+        """
+        return list(self)
 
-        return res
+
+class Policy:
+    """Scheduling policy run by `Solver`
+
+    Holds arrived processes waiting to run, and decides which runs next,
+    whether an arrival preempts the running process and how long a process
+    may run before its time is up.
+    """
+
+    # Kind reported to `on_tie` when processes are equally good to run next
+    tie_kind = None
+    # Whether arrivals are checked with `preempts`
+    preemptive = False
+    # Time slice of every process, or None if `time_slice` depends on the process
+    quantum = float('inf')
+
+    def __init__(self, solver: "Solver"):
+        self.problem = solver.problem
+        self.time_left = solver.time_left
+        self.reverse_ties = solver.reverse_ties
+        self.on_tie = solver.on_tie
+
+    def __len__(self) -> int:
+        raise NotImplementedError()
+
+    def add(self, process: int, time: int):
+        """Add arrived or preempted process to ready processes
+        """
+        raise NotImplementedError()
+
+    def pop(self, time: int) -> int:
+        """Remove next process to run from ready processes
+        """
+        raise NotImplementedError()
+
+    def preempts(self, process: int, running: int, time: int) -> bool:
+        """Check if arriving process replaces running process
+        """
+        return False
+
+    def time_slice(self, process: int) -> float:
+        """Time process may run once dispatched before its time is up
+
+        :return: Time slice, or inf to run until finished or preempted
+        :rtype: float
+        """
+        return self.quantum
+
+    def expire(self, process: int, time: int):
+        """Return process whose time is up to ready processes
+        """
+        self.add(process, time)
+
+    def rotate(self, process: int, time: int) -> int:
+        """Return process whose time is up and remove next process to run
+        """
+        self.expire(process, time)
+        return self.pop(time)
+
+
+class QueuePolicy(Policy):
+    """First come, first served
+    """
+
+    def __init__(self, solver: "Solver"):
+        super().__init__(solver)
+        self.ready = deque()
+
+    def __len__(self) -> int:
+        return len(self.ready)
+
+    def add(self, process: int, time: int):
+        self.ready.append(process)
+
+    def pop(self, time: int) -> int:
+        return self.ready.popleft()
+
+    def rotate(self, process: int, time: int) -> int:
+        self.ready.append(process)
+        return self.ready.popleft()
+
+
+class RoundRobinPolicy(QueuePolicy):
+    """First come, first served, with processes requeued after each quantum
+    """
+
+    def __init__(self, solver: "Solver"):
+        super().__init__(solver)
+        self.quantum = self.problem.quantum
+        if self.quantum < 1:
+            raise Exception('quantum must be at least 1')
+
+
+class HeapPolicy(Policy):
+    """Runs process with the lowest key next, ties broken by process index
+
+    `keys` holds each process' key, read when the process is added. If
+    `preemptive`, an arrival with a lower key than the running process
+    replaces it.
+    """
+
+    def __init__(self, solver: "Solver", keys: List[int]):
+        super().__init__(solver)
+        self.keys = keys
+        self.ready = []  # Heap of (key, tie-break, process)
+
+    def __len__(self) -> int:
+        return len(self.ready)
+
+    def add(self, process: int, time: int):
+        tie_break = -process if self.reverse_ties else process
+        heapq.heappush(self.ready, (self.keys[process], tie_break, process))
+
+    def pop(self, time: int) -> int:
+        key, _, p = heapq.heappop(self.ready)
+        if self.on_tie != None and len(self.ready) > 0 and self.ready[0][0] == key:
+            tied = [p] + [q for k, _, q in self.ready if k == key]
+            self.on_tie(time, self.tie_kind, tied)
+        return p
+
+    def preempts(self, process: int, running: int, time: int) -> bool:
+        key, running_key = self.keys[process], self.keys[running]
+        if key == running_key:
+            if self.on_tie != None:
+                self.on_tie(time, 'preempt', [running, process])
+            return self.reverse_ties
+        return key < running_key
+
+
+class ShortestJobPolicy(HeapPolicy):
+    """Shortest job first
+    """
+
+    tie_kind = 'shortest'
+
+    def __init__(self, solver: "Solver"):
+        super().__init__(solver, solver.time_left)
+
+
+class ShortestRemainingPolicy(ShortestJobPolicy):
+    """Shortest remaining time first
+    """
+
+    preemptive = True
+
+
+class PriorityPolicy(HeapPolicy):
+    """Non-preemptive priority, lower priority values run first
+    """
+
+    tie_kind = 'priority'
+
+    def __init__(self, solver: "Solver"):
+        if solver.problem.priorities == None:
+            raise Exception('priority problem has no priorities')
+        super().__init__(solver, solver.problem.priorities)
+
+
+class PreemptivePriorityPolicy(PriorityPolicy):
+    """Preemptive priority
+    """
+
+    preemptive = True
+
+
+class ResponseRatioPolicy(Policy):
+    """Highest response ratio next, (wait time + execution time) / execution time
+
+    Response ratios change with time at different rates, so no heap order
+    holds between dispatches and picking the next process is O(n).
+    """
+
+    tie_kind = 'ratio'
+
+    def __init__(self, solver: "Solver"):
+        super().__init__(solver)
+        self.ready = []
+
+    def __len__(self) -> int:
+        return len(self.ready)
+
+    def add(self, process: int, time: int):
+        self.ready.append(process)
+
+    def pop(self, time: int) -> int:
+        times = self.problem.times
+        best_i = 0
+        tied = [self.ready[0]]
+        for i in range(1, len(self.ready)):
+            p = self.ready[i]
+            best = self.ready[best_i]
+            # Compare (time - arrival + exec) / exec without division
+            lhs = (time - times[p][0] + times[p][1]) * times[best][1]
+            rhs = (time - times[best][0] + times[best][1]) * times[p][1]
+            if lhs > rhs:
+                best_i = i
+                tied = [p]
+            elif lhs == rhs:
+                tied.append(p)
+                if (p > best) == self.reverse_ties:
+                    best_i = i
+
+        if self.on_tie != None and len(tied) > 1:
+            self.on_tie(time, self.tie_kind, tied)
+
+        # Swap remove, order of ready list does not matter
+        p = self.ready[best_i]
+        self.ready[best_i] = self.ready[-1]
+        self.ready.pop()
+        return p
+
+
+class FeedbackQueuePolicy(Policy):
+    """Multilevel feedback queue
+
+    Arrivals enter the top level. A process whose time is up drops a level,
+    and the quantum doubles with each level. The bottom level runs processes
+    to completion. An arrival preempts a running process on a lower level,
+    which goes back to the end of its level.
+    """
+
+    n_levels = 3
+    preemptive = True
+    quantum = None
+
+    def __init__(self, solver: "Solver"):
+        super().__init__(solver)
+        if self.problem.quantum < 1:
+            raise Exception('quantum must be at least 1')
+        self.levels = [deque() for _ in range(self.n_levels)]
+        self.level = [0] * len(self.problem.times)
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, process: int, time: int):
+        self.levels[self.level[process]].append(process)
+        self.size += 1
+
+    def pop(self, time: int) -> int:
+        self.size -= 1
+        for queue in self.levels:
+            if len(queue) > 0:
+                return queue.popleft()
+
+    def preempts(self, process: int, running: int, time: int) -> bool:
+        return self.level[process] < self.level[running]
+
+    def time_slice(self, process: int) -> float:
+        level = self.level[process]
+        if level == self.n_levels - 1:
+            return float('inf')
+        return self.problem.quantum << level
+
+    def expire(self, process: int, time: int):
+        self.level[process] = min(self.level[process] + 1, self.n_levels - 1)
+        self.add(process, time)
+
+
+class LotteryPolicy(Policy):
+    """Lottery scheduling, drawing a ready process each quantum
+
+    Each process holds one ticket, plus one for each priority level above
+    the lowest if the problem has priorities. Draws come from a generator
+    seeded by the problem, so answers are reproducible. Tickets of ready
+    processes are kept in a Fenwick tree, so draws are O(log n).
+    """
+
+    def __init__(self, solver: "Solver"):
+        super().__init__(solver)
+        n = len(self.problem.times)
+        priorities = self.problem.priorities
+        if priorities == None:
+            self.tickets = [1] * n
+        else:
+            lowest = max(priorities, default=0)
+            self.tickets = [1 + lowest - priority for priority in priorities]
+        self.rng = random.Random(self.problem.to_bytes())
+        self.quantum = self.problem.quantum
+        if self.quantum < 1:
+            raise Exception('quantum must be at least 1')
+        self.capacity = 1
+        while self.capacity < n:
+            self.capacity *= 2
+        self.tree = [0] * (self.capacity + 1)
+        self.total = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, process: int, time: int):
+        self.__update(process, self.tickets[process])
+        self.size += 1
+
+    def pop(self, time: int) -> int:
+        # Find process holding winning ticket
+        target = self.rng.randrange(self.total)
+        pos = 0
+        step = self.capacity
+        while step > 0:
+            if pos + step <= self.capacity and self.tree[pos + step] <= target:
+                pos += step
+                target -= self.tree[pos]
+            step //= 2
+
+        self.__update(pos, -self.tickets[pos])
+        self.size -= 1
+        return pos
+
+    def __update(self, process: int, delta: int):
+        self.total += delta
+        i = process + 1
+        while i <= self.capacity:
+            self.tree[i] += delta
+            i += i & -i
+
+
+# Policy of each scheduling method
+POLICIES: Dict[SchedulingMethod, Type[Policy]] = {
+    SchedulingMethod.FCFS: QueuePolicy,
+    SchedulingMethod.SJF: ShortestJobPolicy,
+    SchedulingMethod.SRTF: ShortestRemainingPolicy,
+    SchedulingMethod.RR: RoundRobinPolicy,
+    SchedulingMethod.NPP: PriorityPolicy,
+    SchedulingMethod.PP: PreemptivePriorityPolicy,
+    SchedulingMethod.HRRN: ResponseRatioPolicy,
+    SchedulingMethod.MLFQ: FeedbackQueuePolicy,
+    SchedulingMethod.LOTTERY: LotteryPolicy,
+}
 
 
 class Solver:
     """Process scheduling solver
     """
 
-    def __init__(self, problem: Problem):
+    def __init__(self, problem: Problem, keep_events: bool = False, reverse_ties: bool = False, on_tie: Callable[[int, str, List[int]], None] = None, policy: Type[Policy] = None, keep_timeline: bool = False):
+        """
+        :param problem: Problem to solve
+        :type problem: Problem
+
+        :param keep_events: Whether to keep the full event log in `logger.events`
+        :type keep_events: bool
+
+        :param reverse_ties: Whether to break ties the opposite way. By default,
+            ties go to the lowest process index, a preemptive running process
+            keeps running against an equal arrival and processes arriving when
+            the running process's time is up are queued before it.
+        :type reverse_ties: bool
+
+        :param on_tie: Called with (time, tie kind, tied processes) at each tie point
+        :type on_tie: Callable[[int, str, List[int]], None]
+
+        :param policy: Scheduling policy to use instead of the one of the problem's method
+        :type policy: Type[Policy]
+
+        :param keep_timeline: Whether to record which process ran when in `timeline`
+        :type keep_timeline: bool
+        """
         self.problem = problem
         self.n_processes = len(problem.times)
-        self.logger = EventLogger(self.n_processes)
+        self.logger = EventLogger(self.n_processes, keep_events=keep_events)
         self.time_left = [exec_t for _, exec_t in problem.times]
-        self.pending_arrivals = set(range(self.n_processes))
-        self.pending_completion = set()
+        self.reverse_ties = reverse_ties
+        self.on_tie = on_tie
+        # Processes in order of arrival, ties broken by process index
+        self.arrival_order = sorted(
+            range(self.n_processes),
+            key=lambda p: (problem.times[p][0], -p if reverse_ties else p),
+        )
+        self.n_arrived = 0
+        if policy == None:
+            if problem.method not in POLICIES:
+                raise Exception('invalid scheduling method')
+            policy = POLICIES[problem.method]
+        # Arrived processes waiting to run
+        self.ready = policy(self)
+        self.timeline = Timeline() if keep_timeline else None
         self.is_solved = False
 
+    @timed('solver.solve')
     def solve(self) -> List[Tuple[int, int]]:
         """Solves for finish and wait times
 
         :return: List of (finish time, wait time) pairs
         :rtype: List[Tuple[int, int]]
         """
+        return self._solve()
+
+    def _solve(self) -> List[Tuple[int, int]]:
+        """Solves without timing into `solver.solve`, for probes that may
+        stop early such as `find_ties`
+        """
         # Error if already solved
         if self.is_solved:
             raise Exception('problem has been solved')
@@ -168,145 +949,200 @@ class Solver:
         return res
 
     def __log_events(self):
-        """Logs events using first come, first served
+        """Logs events using the scheduling policy
         """
-        process_q = []
+        ready = self.ready
+        add_ready = ready.add
+        pop_ready = ready.pop
+        rotate_ready = ready.rotate
+        preemptive = ready.preemptive
+        preempts = ready.preempts
+        quantum = ready.quantum
+        time_slice = ready.time_slice
+        timeline = self.timeline
+        time_left = self.time_left
         n_finished = 0
-        time_remaining = self.problem.quantum
+        time_remaining = 0
         curr_p = None
         curr_t = 0
+        run_start_t = 0  # Time current process was dispatched
 
         while n_finished < self.n_processes:
             # Fast forward to next arrival if none pending
             if curr_p == None:
                 # Find next arrival
                 curr_p, curr_t = self.__find_next_arrival()
-                self.pending_arrivals.remove(curr_p)
-                self.pending_completion.add(curr_p)
+                self.__take_arrival()
+                time_remaining = quantum if quantum != None else time_slice(curr_p)
+                run_start_t = curr_t
                 # Log
                 self.logger.begin_event(curr_t)
-                self.logger.add(curr_p, self.time_left[curr_p])
+                self.logger.add(curr_p, time_left[curr_p])
                 self.logger.end_event()
                 continue
 
             # Find next event time
             next_arrival_p, next_arrival_t = self.__find_next_arrival()
-            finish_curr_t = curr_t + self.time_left[curr_p]
+            finish_curr_t = curr_t + time_left[curr_p]
             time_up_t = curr_t + time_remaining
-            if self.problem.method == SchedulingMethod.RR:
-                next_t = min(next_arrival_t, finish_curr_t, time_up_t)
-            else:
-                next_t = min(next_arrival_t, finish_curr_t)
+            next_t = min(next_arrival_t, finish_curr_t, time_up_t)
 
             # Update times
             dt = next_t - curr_t
-            self.time_left[curr_p] -= dt
+            time_left[curr_p] -= dt
             curr_t += dt
-            if self.problem.method == SchedulingMethod.RR:
-                time_remaining -= dt
+            time_remaining -= dt
 
-            if next_t == next_arrival_t:  # Next event is process arrival
+            is_arrival = next_t == next_arrival_t
+            if is_arrival and next_t == time_up_t and next_t != finish_curr_t:
+                # Arrival at the same time as time up
+                if self.on_tie != None:
+                    self.on_tie(curr_t, 'quantum', [curr_p, next_arrival_p])
+                if self.reverse_ties:
+                    is_arrival = False
+
+            if is_arrival:  # Next event is process arrival
                 # Log
                 self.logger.begin_event(curr_t)
-                self.logger.add(curr_p, self.time_left[curr_p])
-                self.logger.add(next_arrival_p, self.time_left[next_arrival_p])
+                self.logger.add(curr_p, time_left[curr_p])
+                self.logger.add(next_arrival_p, time_left[next_arrival_p])
                 self.logger.end_event()
 
-                # Update sets
-                self.pending_arrivals.remove(next_arrival_p)
-                self.pending_completion.add(next_arrival_p)
-
-                if self.problem.method == SchedulingMethod.FCFS:
-                    # FCFS: Add to queue
-                    process_q.append(next_arrival_p)
-                elif self.problem.method == SchedulingMethod.SJF:
-                    # SJF: no-op
-                    pass
-                elif self.problem.method == SchedulingMethod.SRTF:
-                    # SRTF: Context switch if remaining time of new arrival is less
-                    if self.time_left[next_arrival_p] < self.time_left[curr_p]:
-                        curr_p = next_arrival_p
-                elif self.problem.method == SchedulingMethod.RR:
-                    # RR: Add to queue
-                    process_q.append(next_arrival_p)
+                self.__take_arrival()
+
+                if preemptive and time_left[curr_p] > 0 and preempts(next_arrival_p, curr_p, curr_t):
+                    # Context switch to new arrival
+                    if time_remaining == 0:
+                        ready.expire(curr_p, curr_t)
+                    else:
+                        add_ready(curr_p, curr_t)
+                    if timeline != None:
+                        timeline.add(curr_p, run_start_t, curr_t)
+                    curr_p = next_arrival_p
+                    time_remaining = quantum if quantum != None else time_slice(curr_p)
+                    run_start_t = curr_t
                 else:
-                    raise Exception('invalid scheduling method')
+                    # Otherwise, wait to run
+                    add_ready(next_arrival_p, curr_t)
 
             elif next_t == finish_curr_t:  # Next event is process finish
-                # Reset time remaining if RR
-                if self.problem.method == SchedulingMethod.RR:
-                    time_remaining = self.problem.quantum
-
                 self.logger.begin_event(curr_t)
 
-                # Update sets and number processes finished
-                self.logger.add(curr_p, self.time_left[curr_p])
-                self.pending_completion.remove(curr_p)
+                # Update number processes finished
+                self.logger.add(curr_p, time_left[curr_p])
                 n_finished += 1
+                if timeline != None:
+                    timeline.add(curr_p, run_start_t, curr_t)
 
-                if len(self.pending_completion) > 0:
+                if len(ready) > 0:
                     # Find next process if still more processes pending completion
-                    if self.problem.method == SchedulingMethod.FCFS:
-                        next_p = process_q.pop(0)
-                    elif self.problem.method == SchedulingMethod.SJF:
-                        next_p = self.__find_next_shortest()
-                    elif self.problem.method == SchedulingMethod.SRTF:
-                        next_p = self.__find_next_shortest()
-                    elif self.problem.method == SchedulingMethod.RR:
-                        next_p = process_q.pop(0)
-                    else:
-                        raise Exception('invalid scheduling method')
-
-                    self.logger.add(next_p, self.time_left[next_p])
+                    next_p = pop_ready(curr_t)
+                    self.logger.add(next_p, time_left[next_p])
                     curr_p = next_p
+                    time_remaining = quantum if quantum != None else time_slice(curr_p)
+                    run_start_t = curr_t
                 else:
                     # Otherwise, no current process
                     curr_p = None
 
                 self.logger.end_event()
 
-            elif self.problem.method == SchedulingMethod.RR:  # Next event is time up and using RR
-                # Reset time remaining
-                time_remaining = self.problem.quantum
-
+            else:  # Next event is time up
                 # Update queue and find next process
-                process_q.append(curr_p)
-                next_p = process_q.pop(0)
+                next_p = rotate_ready(curr_p, curr_t)
 
                 # Log
                 self.logger.begin_event(curr_t)
-                self.logger.add(curr_p, self.time_left[curr_p])
-                self.logger.add(next_p, self.time_left[next_p])
+                self.logger.add(curr_p, time_left[curr_p])
+                self.logger.add(next_p, time_left[next_p])
                 self.logger.end_event()
 
+                if timeline != None:
+                    timeline.add(curr_p, run_start_t, curr_t)
                 curr_p = next_p
+                time_remaining = quantum if quantum != None else time_slice(curr_p)
+                run_start_t = curr_t
 
     def __find_next_arrival(self) -> Tuple[int, int]:
         """Find next arriving process
 
-        :return: (process, arrival time) pair
+        :return: (process, arrival time) pair or (None, inf) if all processes have arrived
         :rtype: Tuple[int, int]
         """
-        pending_times = [self.problem.times[i] for i in self.pending_arrivals]
-        best_t = float('inf')
-        best_p = None
-        for p, p_times in zip(self.pending_arrivals, pending_times):
-            if p_times[0] < best_t:
-                best_p = p
-                best_t = p_times[0]
-        return best_p, best_t
-
-    def __find_next_shortest(self) -> int:
-        """Find next process pending completion with shortest time left
-
-        :return: Process index of next process
-        :rtype: int
-        """
-        wait_times = [
-            self.time_left[i] for i in self.pending_completion
-        ]
-        next_p = min(
-            zip(self.pending_completion, wait_times),
-            key=lambda pair: pair[1],
-        )[0]
-        return next_p
+        if self.n_arrived == self.n_processes:
+            return None, float('inf')
+        p = self.arrival_order[self.n_arrived]
+        return p, self.problem.times[p][0]
+
+    def __take_arrival(self):
+        """Mark next arriving process as arrived
+        """
+        if self.on_tie != None:
+            # Report processes arriving at the same time once, at the first of them
+            order = self.arrival_order
+            times = self.problem.times
+            t = times[order[self.n_arrived]][0]
+            if self.n_arrived == 0 or times[order[self.n_arrived-1]][0] != t:
+                end = self.n_arrived + 1
+                while end < self.n_processes and times[order[end]][0] == t:
+                    end += 1
+                if end - self.n_arrived > 1:
+                    self.on_tie(t, 'arrival', order[self.n_arrived:end])
+
+        self.n_arrived += 1
+
+
+class _TieFound(Exception):
+    """Stops solving at first tie point
+    """
+
+
+def find_ties(problem: Problem, first_only: bool = False) -> List[Tuple[int, str, List[int]]]:
+    """Find points where solving problem depends on how ties are broken
+
+    Tie kinds are `arrival` (processes arriving at the same time), `shortest`
+    (SJF/SRTF processes with the same time left), `priority` (NPP/PP
+    processes with the same priority), `ratio` (HRRN processes with the same
+    response ratio), `preempt` (SRTF/PP arrival equal to the running process)
+    and `quantum` (arrival at the same time the running process's quantum is
+    up).
+
+    :param problem: Problem to check
+    :type problem: Problem
+
+    :param first_only: Whether to stop at the first tie point
+    :type first_only: bool
+
+    :return: List of (time, tie kind, tied processes)
+    :rtype: List[Tuple[int, str, List[int]]]
+    """
+    ties = []
+
+    def on_tie(time: int, kind: str, processes: List[int]):
+        ties.append((time, kind, list(processes)))
+        if first_only:
+            raise _TieFound()
+
+    try:
+        Solver(problem, on_tie=on_tie)._solve()
+    except _TieFound:
+        pass
+
+    return ties
+
+
+def is_tie_invariant(problem: Problem) -> bool:
+    """Check if answer is the same however ties are broken
+
+    Compares the answer with ties broken the default way against the answer
+    with every tie broken the opposite way.
+
+    :param problem: Problem to check
+    :type problem: Problem
+
+    :return: Whether answer does not depend on tie-breaking
+    :rtype: bool
+    """
+    if len(find_ties(problem, first_only=True)) == 0:
+        return True
+    return Solver(problem).solve() == Solver(problem, reverse_ties=True).solve()
@@ -1,5 +1,6 @@
-from app import app, db
+from flask_migrate import upgrade
+from app import app
 
 if __name__ == "__main__":
     with app.app_context():
-        db.create_all()
+        upgrade()
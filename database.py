@@ -0,0 +1,229 @@
+import random
+import threading
+import time
+from functools import wraps
+from typing import Dict, List
+from flask import current_app, g, has_app_context, has_request_context, session
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import event, orm
+from sqlalchemy.engine import make_url
+
+# Bind keys of read replicas are REPLICA_BIND_PREFIX + index
+REPLICA_BIND_PREFIX = 'replica_'
+
+# Flask session key holding the time until which a user's reads go to primary
+PRIMARY_UNTIL_KEY = 'db_primary_until'
+
+
+def engine_options(uri: str, pool_size: int = None, max_overflow: int = None, pool_recycle: int = None, pool_timeout: float = None, pool_pre_ping: bool = False, statement_timeout: int = None) -> dict:
+    """Options for `SQLALCHEMY_ENGINE_OPTIONS`
+
+    Unset options keep SQLAlchemy's defaults. Pool sizing is ignored for
+    SQLite, which does not use a queue pool for file databases.
+
+    :param uri: Database URI
+    :type uri: str
+
+    :param pool_size: Connections kept open per worker
+    :type pool_size: int
+
+    :param max_overflow: Connections opened beyond `pool_size` under load
+    :type max_overflow: int
+
+    :param pool_recycle: Seconds after which connections are reopened
+    :type pool_recycle: int
+
+    :param pool_timeout: Seconds to wait for a free connection
+    :type pool_timeout: float
+
+    :param pool_pre_ping: Test connections before use
+    :type pool_pre_ping: bool
+
+    :param statement_timeout: Milliseconds before a statement is cancelled, PostgreSQL only
+    :type statement_timeout: int
+    """
+    options = {}
+    if pool_pre_ping:
+        options['pool_pre_ping'] = True
+    if pool_recycle != None:
+        options['pool_recycle'] = pool_recycle
+
+    backend = make_url(uri).get_backend_name()
+    if backend != 'sqlite':
+        if pool_size != None:
+            options['pool_size'] = pool_size
+        if max_overflow != None:
+            options['max_overflow'] = max_overflow
+        if pool_timeout != None:
+            options['pool_timeout'] = pool_timeout
+    if backend == 'postgresql' and statement_timeout != None:
+        options['connect_args'] = {
+            'options': f'-c statement_timeout={statement_timeout}'
+        }
+    return options
+
+
+def replica_binds(uris: List[str]) -> Dict[str, str]:
+    """`SQLALCHEMY_BINDS` entries for read replicas
+    """
+    return {f'{REPLICA_BIND_PREFIX}{i}': uri for i, uri in enumerate(uris)}
+
+
+class PoolMetrics:
+    """Counts connection checkouts of an engine's pool
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.connects = 0
+        self.invalidated = 0
+
+        event.listen(engine.pool, 'checkout', self.__checkout)
+        event.listen(engine.pool, 'checkin', self.__checkin)
+        event.listen(engine.pool, 'connect', self.__connect)
+        event.listen(engine.pool, 'invalidate', self.__invalidate)
+
+    def __checkout(self, *_):
+        with self.lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def __checkin(self, *_):
+        with self.lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def __connect(self, *_):
+        with self.lock:
+            self.connects += 1
+
+    def __invalidate(self, *_):
+        with self.lock:
+            self.invalidated += 1
+
+    def stats(self) -> dict:
+        """Pool statistics
+
+        `size` and `overflow` are only reported for queue pools.
+        """
+        pool = self.engine.pool
+        with self.lock:
+            res = {
+                'pool': type(pool).__name__,
+                'checked_out': self.checked_out,
+                'peak_checked_out': self.peak_checked_out,
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'invalidated': self.invalidated,
+            }
+        if hasattr(pool, 'overflow'):
+            res['size'] = pool.size()
+            res['overflow'] = pool.overflow()
+            res['checked_in'] = pool.checkedin()
+        return res
+
+
+class RoutingSession(SignallingSession):
+    """Session that sends reads to a replica inside `read_replica` views
+
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary, as
+    do reads of users who wrote within `REPLICA_PIN_SECONDS`, so they see
+    their own writes despite replication lag.
+    """
+
+    def __init__(self, db, **options):
+        super().__init__(db, **options)
+        self.wrote = False
+        event.listen(self, 'after_flush', self.__after_flush)
+        event.listen(self, 'after_commit', self.__after_commit)
+        event.listen(self, 'after_rollback', self.__after_rollback)
+
+    def get_bind(self, mapper=None, clause=None):
+        if (
+            not self._flushing
+            and not getattr(clause, 'is_dml', False)
+            and use_replica()
+        ):
+            state = get_state(self.app)
+            replicas = self.app.config.get('DATABASE_REPLICAS', 0)
+            name = f'{REPLICA_BIND_PREFIX}{random.randrange(replicas)}'
+            return state.db.get_engine(self.app, bind=name)
+        return super().get_bind(mapper, clause)
+
+    def execute(self, clause, *args, **kwargs):
+        if getattr(clause, 'is_dml', False):
+            self.wrote = True
+        return super().execute(clause, *args, **kwargs)
+
+    def __after_flush(self, *_):
+        self.wrote = True
+
+    def __after_commit(self, _):
+        if self.wrote and has_request_context():
+            pin = self.app.config.get('REPLICA_PIN_SECONDS', 0)
+            if pin > 0 and self.app.config.get('DATABASE_REPLICAS', 0) > 0:
+                session[PRIMARY_UNTIL_KEY] = time.time() + pin
+        self.wrote = False
+
+    def __after_rollback(self, _):
+        self.wrote = False
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy with read replica routing and pool metrics
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool_metrics = {}
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def create_engine(self, sa_url, engine_opts):
+        engine = super().create_engine(sa_url, engine_opts)
+        self.pool_metrics[engine] = PoolMetrics(engine)
+        return engine
+
+    def pool_stats(self, app=None) -> Dict[str, dict]:
+        """Pool statistics of primary and replica engines
+
+        :return: Statistics by bind, `primary` for the primary database
+        :rtype: Dict[str, dict]
+        """
+        app = self.get_app(app)
+        res = {}
+        for bind in [None] + list(app.config.get('SQLALCHEMY_BINDS') or ()):
+            metrics = self.pool_metrics.get(self.get_engine(app, bind))
+            if metrics != None:
+                res[bind or 'primary'] = metrics.stats()
+        return res
+
+
+def use_replica() -> bool:
+    """Checks if reads in current context should go to a replica
+    """
+    if not has_app_context() or not g.get('read_replica', False):
+        return False
+    if has_request_context() and session.get(PRIMARY_UNTIL_KEY, 0) > time.time():
+        return False
+    return True
+
+
+def read_replica(f):
+    """Sends the view's reads to a read replica, if any are configured
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if current_app.config.get('DATABASE_REPLICAS', 0) == 0:
+            return f(*args, **kwargs)
+        g.read_replica = True
+        try:
+            return f(*args, **kwargs)
+        finally:
+            g.read_replica = False
+    return wrapper
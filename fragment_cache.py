@@ -0,0 +1,53 @@
+import hashlib
+import threading
+import time
+from typing import Callable, Optional
+from markupsafe import Markup
+
+
+class Fragment:
+    """Rendered HTML with an ETag of its content
+    """
+
+    def __init__(self, version: int, html: str, modified_at: float):
+        self.version = version
+        self.html = Markup(html)
+        self.etag = hashlib.md5(html.encode('utf-8')).hexdigest()
+        self.modified_at = modified_at
+
+
+class FragmentCache:
+    """Cache of rendered fragments, each kept until its version changes
+
+    Callers pass the current version of the data a fragment is rendered
+    from, e.g. the leaderboard version, so writes invalidate by bumping the
+    version instead of deleting entries.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: str, version: int, render: Callable[[], str], modified_at: Optional[float] = None) -> Fragment:
+        """Gets fragment, rendering it if missing or of another version
+
+        :param render: Function returning the fragment's HTML
+        :type render: Callable[[], str]
+
+        :param modified_at: Time the data last changed, defaults to now
+        :type modified_at: Optional[float]
+        """
+        fragment = self.entries.get(key)
+        if fragment != None and fragment.version == version:
+            return fragment
+
+        # Rendered outside lock, concurrent misses may each render once
+        fragment = Fragment(version, render(), modified_at if modified_at != None else time.time())
+        with self.lock:
+            current = self.entries.get(key)
+            if current == None or current.version <= version:
+                self.entries[key] = fragment
+        return fragment
+
+
+fragment_cache = FragmentCache()
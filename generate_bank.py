@@ -0,0 +1,161 @@
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+from typing import List, Optional, Tuple
+from challenge import BASIC_METHODS, Problem, SchedulingMethod, Solver
+from workloads import WORKLOADS
+
+
+def parse_methods(value: str) -> List[Tuple[SchedulingMethod, float]]:
+    """Parses method mix
+
+    :param value: Comma separated methods with optional weights, e.g. `FCFS:2,RR`
+    :type value: str
+
+    :return: List of (method, weight) pairs
+    :rtype: List[Tuple[SchedulingMethod, float]]
+    """
+    mix = []
+    for item in value.split(','):
+        name, _, weight = item.partition(':')
+        try:
+            method = SchedulingMethod(name.strip().upper())
+        except ValueError:
+            raise argparse.ArgumentTypeError(f'invalid scheduling method: {name}')
+        mix.append((method, float(weight) if weight else 1.0))
+    return mix
+
+
+def parse_counts(value: str) -> List[int]:
+    """Parses process counts
+
+    :param value: Comma separated counts or inclusive ranges, e.g. `3,5-8`
+    :type value: str
+
+    :return: List of process counts
+    :rtype: List[int]
+    """
+    counts = []
+    for item in value.split(','):
+        lo, _, hi = item.partition('-')
+        counts.extend(range(int(lo), int(hi or lo) + 1))
+    return counts
+
+
+def generate_item(args: Tuple[int, int, List[Tuple[SchedulingMethod, float]], List[int], int, bool, str]) -> Optional[str]:
+    """Generates and solves one problem
+
+    The problem only depends on the seed and its index, so output does not
+    depend on which worker handles it.
+
+    :return: JSON line for problem, or None if no uniquely solvable problem was found
+    :rtype: Optional[str]
+    """
+    seed, idx, methods, counts, max_time, unique, workload = args
+    rng = random.Random(f'{seed}-{idx}')
+
+    method = rng.choices(
+        [m for m, _ in methods],
+        weights=[w for _, w in methods],
+    )[0]
+    n_processes = rng.choice(counts)
+    try:
+        if workload == None:
+            problem = Problem.generate(
+                method, n_processes, max_time=max_time, rng=rng, unique=unique
+            )
+        else:
+            problem = Problem.generate_workload(
+                method, n_processes, WORKLOADS[workload], rng=rng, unique=unique
+            )
+    except Exception:
+        return None
+    solver = Solver(problem, keep_timeline=True)
+    answer = solver.solve()
+
+    item = {
+        'id': idx,
+        'method': problem.method,
+        'times': problem.times,
+        'quantum': problem.quantum,
+        'answer': answer,
+        'segments': solver.timeline.to_list(),
+    }
+    if problem.priorities != None:
+        item['priorities'] = problem.priorities
+    return json.dumps(item)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate and solve problems into a JSON lines problem bank',
+    )
+    parser.add_argument('-n', '--count', type=int, required=True,
+                        help='number of problems')
+    parser.add_argument('-o', '--output', default='-',
+                        help='output file (default: stdout)')
+    parser.add_argument('--methods', type=parse_methods,
+                        default=[(m, 1.0) for m in BASIC_METHODS],
+                        help='methods with optional weights, e.g. FCFS:2,SJF,RR (default: FCFS,SJF,SRTF,RR)')
+    parser.add_argument('--processes', type=parse_counts, default=[3],
+                        help='process counts, e.g. 3,5-8 (default: 3)')
+    parser.add_argument('--max-time', type=int, default=20,
+                        help='max arrival time (default: 20)')
+    parser.add_argument('--workload', choices=sorted(WORKLOADS),
+                        help='draw arrivals and execution times from a workload instead, ignores --max-time and implies --allow-ties')
+    parser.add_argument('--allow-ties', action='store_true',
+                        help='keep problems whose answer depends on tie-breaking')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='random seed (default: 0)')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                        help='number of worker processes (default: number of cores)')
+    parser.add_argument('--chunksize', type=int, default=1000,
+                        help='problems per task sent to a worker (default: 1000)')
+    args = parser.parse_args()
+
+    if args.workload == None and max(args.processes) >= args.max_time:
+        parser.error('process counts must be less than max time')
+    if args.workload != None:
+        # Workloads have simultaneous arrivals, so ties are almost certain
+        args.allow_ties = True
+    if not args.allow_ties:
+        # Some methods rarely give uniquely solvable problems with many processes
+        rng = random.Random(args.seed)
+        for method, _ in args.methods:
+            for n_processes in sorted(set(args.processes)):
+                try:
+                    Problem.generate(method, n_processes, max_time=args.max_time, rng=rng, unique=True)
+                except Exception:
+                    parser.error(
+                        f'could not generate uniquely solvable {method.value} problems '
+                        f'with {n_processes} processes, use fewer processes or --allow-ties'
+                    )
+
+    tasks = (
+        (args.seed, i, args.methods, args.processes, args.max_time, not args.allow_ties, args.workload)
+        for i in range(args.count)
+    )
+
+    n_skipped = 0
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        with multiprocessing.Pool(args.workers) as pool:
+            # imap keeps input order so output is the same for any number of workers
+            for line in pool.imap(generate_item, tasks, chunksize=args.chunksize):
+                if line == None:
+                    n_skipped += 1
+                    continue
+                out.write(line)
+                out.write('\n')
+    finally:
+        if out != sys.stdout:
+            out.close()
+
+    if n_skipped > 0:
+        print(f'skipped {n_skipped} problems with no uniquely solvable sample', file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import argparse
+import csv
+import io
+import json
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from challenge import QUANTUM_METHODS, Problem, SchedulingMethod
+from solution_cache import MemoryBackend, SolutionCache
+from utils import parse_int
+
+# Problems solved per distinct problem kept by the command line grader
+DEFAULT_CACHE_SIZE = 10000
+
+# Largest arrival or execution time accepted
+MAX_TIME = 10 ** 9
+
+# Columns of CSV results
+RESULT_FIELDS = ['id', 'correct', 'n_processes', 'score', 'error']
+
+
+def _is_int(v) -> bool:
+    return isinstance(v, int) and not isinstance(v, bool)
+
+
+def parse_problem(data: dict) -> Problem:
+    """Problem of a submission, given as a `problem` object or a `token`
+
+    :raises Exception: If submission has no valid problem
+    """
+    if data.get('token'):
+        return Problem.from_token(data['token'])
+
+    problem = data.get('problem')
+    if isinstance(problem, str):
+        problem = json.loads(problem)
+    if not isinstance(problem, dict):
+        raise Exception('submission has no problem or token')
+    try:
+        method = SchedulingMethod(problem['method'])
+        times = [(arrival_t, exec_t) for arrival_t, exec_t in problem['times']]
+    except (KeyError, TypeError, ValueError):
+        raise Exception('invalid problem')
+    # Floats and booleans would otherwise be graded as truncated times
+    if not all(_is_int(arrival_t) and _is_int(exec_t) for arrival_t, exec_t in times):
+        raise Exception('times must be integers')
+    quantum = problem.get('quantum') or 0
+    if not _is_int(quantum):
+        raise Exception('quantum must be an integer')
+    priorities = problem.get('priorities')
+    if priorities != None and not (isinstance(priorities, list) and all(_is_int(p) for p in priorities)):
+        raise Exception('priorities must be a list of integers')
+    return Problem(method, times, quantum=quantum, priorities=priorities)
+
+
+def simulation_steps(problem: Problem) -> int:
+    """Upper bound on the scheduling events needed to solve problem
+
+    Quantum methods take a step per time slice, so their work grows with
+    execution times rather than the number of processes.
+    """
+    n = len(problem.times)
+    if problem.method in QUANTUM_METHODS:
+        quantum = max(int(problem.quantum or 0), 1)
+        return 2 * n + sum(-(-exec_t // quantum) for _, exec_t in problem.times)
+    return 2 * n
+
+
+def check_problem(problem: Problem, max_processes: int = None, max_steps: int = None):
+    """Rejects problems too costly or invalid to grade
+
+    :raises Exception: If problem has negative or too large times, or exceeds
+        `max_processes` or `max_steps`
+    """
+    if max_processes != None and len(problem.times) > max_processes:
+        raise Exception(f'more than {max_processes} processes')
+    for arrival_t, exec_t in problem.times:
+        if arrival_t < 0 or exec_t < 0:
+            raise Exception('times must not be negative')
+        if arrival_t > MAX_TIME or exec_t > MAX_TIME:
+            raise Exception(f'times must be at most {MAX_TIME}')
+    if problem.method in QUANTUM_METHODS and (problem.quantum == None or problem.quantum < 1):
+        raise Exception('quantum must be at least 1')
+    if max_steps != None and simulation_steps(problem) > max_steps:
+        raise Exception(f'problem needs more than {max_steps} scheduling steps')
+
+
+def parse_jsonl(lines: Iterable[str]) -> Iterator[Tuple[Optional[dict], List[Tuple[Optional[int], Optional[int]]], Optional[str]]]:
+    """Parses JSON lines submissions
+
+    Each line has an optional `id`, a `problem` object or `token` and an
+    `answer` list of (finish time, wait time) integer pairs. Lines that are
+    not valid give an error instead of stopping the run.
+
+    :return: Iterator of (submission, answer, error) triples
+    :rtype: Iterator[Tuple[Optional[dict], List[Tuple[Optional[int], Optional[int]]], Optional[str]]]
+    """
+    for line in lines:
+        if len(line.strip()) == 0:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield None, [], 'invalid JSON'
+            continue
+        if not isinstance(data, dict):
+            yield None, [], 'submission is not an object'
+            continue
+
+        pairs = data.get('answer')
+        if pairs == None:
+            pairs = []
+        if not isinstance(pairs, list) or not all(
+            isinstance(pair, list) and len(pair) == 2 and all(_is_int(v) for v in pair)
+            for pair in pairs
+        ):
+            yield data, [], 'answer must be a list of [finish, wait] integer pairs'
+            continue
+        yield data, [tuple(pair) for pair in pairs], None
+
+
+def parse_csv(lines: Iterable[str]) -> Iterator[Tuple[Optional[dict], List[Tuple[Optional[int], Optional[int]]], Optional[str]]]:
+    """Parses CSV submissions
+
+    Rows have optional `id`, a `token` or `problem` JSON column, and
+    `finish_<i>` and `wait_<i>` columns for each process, named like the
+    challenge form fields.
+
+    :return: Iterator of (submission, answer, error) triples
+    :rtype: Iterator[Tuple[Optional[dict], List[Tuple[Optional[int], Optional[int]]], Optional[str]]]
+    """
+    for row in csv.DictReader(lines):
+        answer = []
+        i = 0
+        while f'finish_{i}' in row:
+            answer.append((
+                parse_int(row.get(f'finish_{i}') or ''),
+                parse_int(row.get(f'wait_{i}') or ''),
+            ))
+            i += 1
+        yield row, answer, None
+
+
+PARSERS = {
+    'jsonl': parse_jsonl,
+    'csv': parse_csv,
+}
+
+
+def grade(submissions: Iterable[Tuple[Optional[dict], List[Tuple[Optional[int], Optional[int]]], Optional[str]]], cache: SolutionCache, max_processes: int = None, max_steps: int = None) -> Iterator[Dict]:
+    """Grades submissions with partial credit per process
+
+    A process is correct if both its finish and wait times are. Answers are
+    solved once per distinct problem through `cache`.
+
+    :param max_processes: Reject problems with more processes than this
+    :type max_processes: int
+
+    :param max_steps: Reject problems needing more scheduling steps than this
+    :type max_steps: int
+
+    :return: Iterator of results with `id`, `correct` processes,
+        `n_processes`, `score` as the fraction correct and `error`
+    :rtype: Iterator[Dict]
+    """
+    for data, answer, error in submissions:
+        sub_id = data.get('id') if data != None else None
+        if error == None:
+            try:
+                problem = parse_problem(data)
+                check_problem(problem, max_processes=max_processes, max_steps=max_steps)
+                expected = cache.solve(problem)
+            except Exception as e:
+                error = str(e)
+
+        if error != None:
+            yield {'id': sub_id, 'correct': 0, 'n_processes': 0, 'score': 0.0, 'error': error}
+            continue
+
+        n_correct = sum(
+            1 for i, pair in enumerate(expected)
+            if i < len(answer) and answer[i] == tuple(pair)
+        )
+        yield {
+            'id': sub_id,
+            'correct': n_correct,
+            'n_processes': len(expected),
+            'score': n_correct / len(expected) if len(expected) > 0 else 1.0,
+            'error': None,
+        }
+
+
+def format_results(results: Iterable[Dict], fmt: str) -> Iterator[str]:
+    """Formats results as JSON lines or CSV, one chunk per result
+    """
+    if fmt == 'jsonl':
+        for res in results:
+            yield json.dumps(res) + '\n'
+        return
+
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=RESULT_FIELDS, lineterminator='\n')
+    writer.writeheader()
+    for res in results:
+        writer.writerow(res)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+
+
+def grade_stream(lines: Iterable[str], fmt: str, cache: SolutionCache, max_processes: int = None, max_steps: int = None) -> Iterator[str]:
+    """Grades submissions line by line into formatted result chunks
+
+    :param fmt: `jsonl` or `csv`, used for both submissions and results
+    :type fmt: str
+    """
+    if fmt not in PARSERS:
+        raise Exception(f'invalid format: {fmt}')
+    results = grade(PARSERS[fmt](lines), cache, max_processes=max_processes, max_steps=max_steps)
+    return format_results(results, fmt)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Grade answer sheets against their problems',
+    )
+    parser.add_argument('input', nargs='?', default='-',
+                        help='submissions file (default: stdin)')
+    parser.add_argument('-o', '--output', default='-',
+                        help='results file (default: stdout)')
+    parser.add_argument('--format', choices=sorted(PARSERS),
+                        help='submission and result format (default: from input extension, else jsonl)')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE,
+                        help=f'distinct problems to keep solved (default: {DEFAULT_CACHE_SIZE})')
+    parser.add_argument('--max-steps', type=int,
+                        help='reject problems needing more scheduling steps (default: no limit)')
+    args = parser.parse_args()
+
+    fmt = args.format
+    if fmt == None:
+        fmt = 'csv' if args.input.endswith('.csv') else 'jsonl'
+    cache = SolutionCache(MemoryBackend(max_size=args.cache_size))
+
+    f = sys.stdin if args.input == '-' else open(args.input, newline='')
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    try:
+        for chunk in grade_stream(f, fmt, cache, max_steps=args.max_steps):
+            out.write(chunk)
+    finally:
+        if f != sys.stdin:
+            f.close()
+        if out != sys.stdout:
+            out.close()
+
+    stats = cache.stats()
+    print(
+        f"Solved {stats['misses']} distinct problems, reused {stats['hits']} answers",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+import bcrypt
+from metrics import timed
+
+DEFAULT_ROUNDS = 12
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUE = 2
+
+
+class HasherBusy(Exception):
+    """Raised when too many password hashes are already queued
+    """
+
+
+class PasswordHasher:
+    """Bounded worker pool for bcrypt hashing and verification
+
+    bcrypt releases the GIL, so hashes run in parallel on the pool's threads
+    while at most `max_workers + max_queue` are accepted at once. Further
+    requests fail fast with `HasherBusy` instead of tying up request workers.
+    Callers block on their hash, so `max_workers + max_queue` should stay
+    below the request threads of a worker process to leave threads free for
+    other pages during login bursts.
+    """
+
+    def __init__(self, rounds: int = DEFAULT_ROUNDS, max_workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE):
+        """
+        :param rounds: bcrypt cost factor for new hashes
+        :type rounds: int
+
+        :param max_workers: Number of hashing threads
+        :type max_workers: int
+
+        :param max_queue: Number of hashes that may wait for a thread
+        :type max_queue: int
+        """
+        self.rounds = rounds
+        self.configure(max_workers, max_queue)
+
+    def init_app(self, app):
+        """Configures hasher from app config
+        """
+        self.rounds = app.config.get('BCRYPT_ROUNDS', DEFAULT_ROUNDS)
+        self.configure(
+            app.config.get('BCRYPT_WORKERS', DEFAULT_WORKERS),
+            app.config.get('BCRYPT_MAX_QUEUE', DEFAULT_MAX_QUEUE),
+        )
+
+    def configure(self, max_workers: int, max_queue: int):
+        """Replaces worker pool
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='bcrypt'
+        )
+        self.slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def submit(self, f, *args) -> Future:
+        """Runs function on worker pool
+
+        :raises HasherBusy: If pool and queue are full
+        """
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            raise HasherBusy('too many password hashes in progress')
+
+        with self.lock:
+            self.in_flight += 1
+        future = self.executor.submit(f, *args)
+        future.add_done_callback(self.__done)
+        return future
+
+    def __done(self, _: Future):
+        with self.lock:
+            self.in_flight -= 1
+            self.completed += 1
+        self.slots.release()
+
+    def hash(self, password: str) -> str:
+        """Hashes password with current cost factor
+        """
+        return self.submit(self._hash, password, self.rounds).result()
+
+    def check(self, password: str, password_hash: str) -> bool:
+        """Checks password against hash
+        """
+        return self.submit(self._check, password, password_hash).result()
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Checks if hash was made with a different cost factor
+        """
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def stats(self) -> dict:
+        """Pool statistics
+        """
+        with self.lock:
+            in_flight = self.in_flight
+            return {
+                'workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'running': min(in_flight, self.max_workers),
+                'queued': max(in_flight - self.max_workers, 0),
+                'completed': self.completed,
+                'rejected': self.rejected,
+            }
+
+    @staticmethod
+    @timed('bcrypt.hash')
+    def _hash(password: str, rounds: int) -> str:
+        return bcrypt.hashpw(
+            password.encode('utf-8'), bcrypt.gensalt(rounds)
+        ).decode('utf-8')
+
+    @staticmethod
+    @timed('bcrypt.check')
+    def _check(password: str, password_hash: str) -> bool:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+hasher = PasswordHasher()
@@ -0,0 +1,169 @@
+import collections
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from models import db, User, LeaderboardState, ScoreCount
+
+# Number of top users whose changes bump the version
+DEFAULT_WATCH_SIZE = 20
+
+# Seconds to reuse the version read from the database
+DEFAULT_STATE_TTL = 1
+
+
+class Leaderboard:
+    """Leaderboard read from the database
+
+    Top users are read through the `(score DESC, id)` index, so pages are
+    always current across workers. Users with the same score share a rank
+    and are listed by id. Ranks are summed from the number of users per
+    score, which writers keep with `move` in the same transaction as their
+    score changes.
+
+    A version stored in the database is bumped, and its modified time set,
+    whenever a score or username change may alter the top `watch_size`
+    users, so renderings of them can be cached until then. Scores only
+    increase, so a change can only affect the top users if the user is
+    among them afterwards. The version is read at most once per `state_ttl`
+    seconds, so other workers see a bump within that time.
+    """
+
+    def __init__(self, watch_size: int = DEFAULT_WATCH_SIZE, state_ttl: float = DEFAULT_STATE_TTL):
+        self.watch_size = watch_size
+        self.state_ttl = state_ttl
+        self.cached_state = None  # (version, modified time, expiry)
+
+    def top(self, n: int) -> List[Dict]:
+        """Top users by score
+
+        :param n: Max number of users
+        :type n: int
+
+        :return: List of {'rank', 'username', 'score'} for each user
+        :rtype: List[Dict]
+        """
+        rows = db.session.query(User.username, User.score).order_by(
+            User.score.desc(), User.id
+        ).limit(n)
+
+        res = []
+        for i, (username, score) in enumerate(rows):
+            # Ties share the rank of the first of them
+            rank = res[-1]['rank'] if len(res) > 0 and res[-1]['score'] == score else i + 1
+            res.append({'rank': rank, 'username': username, 'score': score})
+        return res
+
+    def rank(self, user_id: int, score: int = None) -> Optional[int]:
+        """Rank of user
+
+        :param score: User's score, looked up if not given
+        :type score: int
+
+        :return: 1 + number of users with a higher score, or None if user not found
+        :rtype: Optional[int]
+        """
+        if score == None:
+            score = db.session.query(User.score).filter_by(id=user_id).scalar()
+            if score == None:
+                return None
+        above = db.session.query(func.sum(ScoreCount.n)).filter(ScoreCount.score > score).scalar()
+        return (above or 0) + 1
+
+    def move(self, changes: Iterable[Tuple[Optional[int], int]]):
+        """Updates number of users per score in the current transaction,
+        which the caller commits along with the score changes
+
+        :param changes: (old score, new score) pairs, old score None for new users
+        :type changes: Iterable[Tuple[Optional[int], int]]
+        """
+        deltas = collections.Counter()
+        for old, new in changes:
+            if old != None:
+                deltas[old] -= 1
+            deltas[new] += 1
+        # Sorted so concurrent writers lock rows in the same order
+        rows = [{'score': score, 'n': n} for score, n in sorted(deltas.items()) if n != 0]
+        if len(rows) == 0:
+            return
+
+        table = ScoreCount.__table__
+        dialect = db.engine.dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+            stmt = insert(table).values(rows)
+            db.session.execute(stmt.on_conflict_do_update(
+                index_elements=[table.c.score], set_={'n': table.c.n + stmt.excluded.n},
+            ))
+            return
+
+        for row in rows:
+            res = db.session.execute(table.update().where(
+                table.c.score == row['score']
+            ).values(n=table.c.n + row['n']))
+            if res.rowcount == 0:
+                db.session.execute(table.insert().values(row))
+
+    def state(self) -> Tuple[int, float]:
+        """Current version and the time it was bumped
+
+        :return: (version, modified time) pair
+        :rtype: Tuple[int, float]
+        """
+        cached = self.cached_state
+        if cached != None and cached[2] > time.monotonic():
+            return cached[0], cached[1]
+
+        row = db.session.query(
+            LeaderboardState.version, LeaderboardState.modified_at
+        ).filter_by(id=1).first()
+        version, modified_at = (row.version, row.modified_at) if row != None else (0, 0.0)
+        self.cached_state = (version, modified_at, time.monotonic() + self.state_ttl)
+        return version, modified_at
+
+    def update(self, user_id: int, score: int):
+        """Bumps version if user's committed score or username may change
+        the top users
+        """
+        self.update_many([(user_id, score)])
+
+    def update_many(self, users: Iterable[Tuple[int, int]]):
+        """Bumps version at most once for users' committed scores
+
+        :param users: (user id, score) pairs
+        :type users: Iterable[Tuple[int, int]]
+        """
+        last = db.session.query(User.id, User.score).order_by(
+            User.score.desc(), User.id
+        ).offset(self.watch_size - 1).limit(1).first()
+
+        for user_id, score in users:
+            if last == None or (score, -user_id) >= (last.score, -last.id):
+                self.__touch()
+                return
+
+    def __touch(self):
+        now = time.time()
+        n = db.session.query(LeaderboardState).filter_by(id=1).update({
+            'version': LeaderboardState.version + 1,
+            'modified_at': now,
+        }, synchronize_session=False)
+        if n > 0:
+            db.session.commit()
+            # This worker sees its own bumps at once
+            self.cached_state = None
+            return
+
+        db.session.add(LeaderboardState(id=1, version=1, modified_at=now))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker created the row first
+            db.session.rollback()
+            self.__touch()
+            return
+        self.cached_state = None
+
+
+leaderboard = Leaderboard()
@@ -0,0 +1,83 @@
+import argparse
+import json
+import sys
+from sqlalchemy import func
+from app import app, db
+from models import BankProblem
+from challenge import Problem
+
+BATCH_SIZE = 10000
+
+
+def load(lines, batch_size: int = BATCH_SIZE) -> int:
+    """Loads problems from `generate_bank.py` output into the problem bank
+
+    Problems are appended after existing ones with the same method and size.
+
+    :return: Number of problems loaded
+    :rtype: int
+    """
+    next_slot = {
+        (method, n_processes): slot + 1
+        for method, n_processes, slot in db.session.query(
+            BankProblem.method,
+            BankProblem.n_processes,
+            func.max(BankProblem.slot),
+        ).group_by(BankProblem.method, BankProblem.n_processes)
+    }
+
+    n_loaded = 0
+    batch = []
+    for line in lines:
+        if len(line.strip()) == 0:
+            continue
+        data = json.loads(line)
+
+        key = (data['method'], len(data['times']))
+        slot = next_slot.get(key, 0)
+        next_slot[key] = slot + 1
+
+        batch.append({
+            'method': data['method'],
+            'n_processes': len(data['times']),
+            'slot': slot,
+            'problem': Problem(
+                data['method'],
+                data['times'],
+                quantum=data['quantum'],
+                priorities=data.get('priorities'),
+            ).to_json(),
+            'answer': json.dumps(data['answer']),
+            'segments': json.dumps(data['segments']) if 'segments' in data else None,
+        })
+
+        if len(batch) >= batch_size:
+            db.session.bulk_insert_mappings(BankProblem, batch)
+            db.session.commit()
+            n_loaded += len(batch)
+            batch = []
+
+    if len(batch) > 0:
+        db.session.bulk_insert_mappings(BankProblem, batch)
+        db.session.commit()
+        n_loaded += len(batch)
+
+    return n_loaded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Load JSON lines from generate_bank.py into the problem bank',
+    )
+    parser.add_argument('input', nargs='?', default='-',
+                        help='input file (default: stdin)')
+    args = parser.parse_args()
+
+    with app.app_context():
+        f = sys.stdin if args.input == '-' else open(args.input)
+        try:
+            n = load(f)
+        finally:
+            if f != sys.stdin:
+                f.close()
+        print(f'Loaded {n} problems')
@@ -0,0 +1,121 @@
+import argparse
+import random
+import statistics
+import time
+from typing import Callable, List
+from sqlalchemy import text
+from app import app, db
+from hashing import hasher
+from leaderboard import leaderboard
+from models import User
+
+BATCH_SIZE = 10000
+
+
+def create_users(n_users: int, seed: int):
+    """Bulk inserts users named `loadtest{i}` with random scores
+
+    Every user shares one password hash, so no time is spent in bcrypt.
+    """
+    rng = random.Random(seed)
+    password_hash = hasher.hash('loadtest')
+    table = User.__table__
+
+    for start in range(0, n_users, BATCH_SIZE):
+        rows = [{
+            'username': f'loadtest{i}',
+            'email': f'loadtest{i}@example.com',
+            'password_hash': password_hash,
+            'is_verified': True,
+            # Most users have few points, a few have many
+            'score': int(rng.expovariate(1 / 20)),
+            'code': None,
+        } for i in range(start, min(start + BATCH_SIZE, n_users))]
+        db.session.execute(table.insert(), rows)
+        leaderboard.move((None, row['score']) for row in rows)
+        db.session.commit()
+        print(f'Inserted {start + len(rows)} users')
+
+
+def explain(sql: str, params: dict) -> List[str]:
+    """Query plan for SQL statement
+    """
+    if db.engine.dialect.name == 'postgresql':
+        rows = db.session.execute(text(f'EXPLAIN ANALYZE {sql}'), params)
+        return [row[0] for row in rows]
+    elif db.engine.dialect.name == 'sqlite':
+        rows = db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}'), params)
+        return [row[-1] for row in rows]
+    else:
+        return []
+
+
+def time_query(f: Callable[[], object], repeat: int) -> float:
+    """Median milliseconds to run query
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def check_queries(n_users: int, repeat: int):
+    """Prints plans and timings of hot queries
+    """
+    username = f'loadtest{n_users // 2}'
+    score = User.query.filter_by(username=username).first().score
+    queries = [
+        (
+            'scoreboard',
+            'SELECT id, username, score FROM "user" ORDER BY score DESC, id LIMIT 20',
+            {},
+            lambda: User.query.order_by(User.score.desc(), User.id).limit(20).all(),
+        ),
+        (
+            'rank',
+            'SELECT sum(n) FROM score_count WHERE score > :score',
+            {'score': score},
+            lambda: leaderboard.rank(None, score),
+        ),
+        (
+            'login',
+            'SELECT * FROM "user" WHERE username = :username',
+            {'username': username},
+            lambda: User.query.filter_by(username=username).first(),
+        ),
+        (
+            'password reset',
+            'SELECT * FROM "user" WHERE code = :code',
+            {'code': 'missing'},
+            lambda: User.query.filter_by(code='missing').first(),
+        ),
+    ]
+
+    for name, sql, params, query in queries:
+        print(f'\n{name}: {time_query(query, repeat):.3f} ms')
+        for line in explain(sql, params):
+            print(f'  {line}')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Fill database with users and check hot query plans. Do not run against production.',
+    )
+    parser.add_argument('-n', '--users', type=int, default=1000000,
+                        help='number of users to insert (default: 1000000)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='random seed (default: 0)')
+    parser.add_argument('--repeat', type=int, default=100,
+                        help='runs per query timing, median is reported (default: 100)')
+    parser.add_argument('--skip-insert', action='store_true',
+                        help='only check queries against existing users')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if not args.skip_insert:
+            if User.query.filter(User.username.like('loadtest%')).first() != None:
+                parser.error('load test users already exist, use --skip-insert')
+            create_users(args.users, args.seed)
+        check_queries(args.users, args.repeat)
@@ -1,17 +1,273 @@
 import os
-import sendgrid
-from sendgrid.helpers.mail import *
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import http.client
+from typing import List
+from metrics import subsystem_seconds
 
-sg = sendgrid.SendGridAPIClient(api_key=os.environ.get('SENDGRID_API_KEY'))
+SENDGRID_HOST = 'api.sendgrid.com'
 SENDER_EMAIL = os.environ.get('SENDER_EMAIL')
 
+# Max personalizations SendGrid accepts per request
+MAX_BATCH_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+class Message:
+    """Plain text email
+    """
+    __slots__ = ('to', 'subject', 'body')
+
+    def __init__(self, to: str, subject: str, body: str):
+        self.to = to
+        self.subject = subject
+        self.body = body
+
+
+class TransientError(Exception):
+    """Sending failed but may succeed if retried
+    """
+
+    def __init__(self, message: str, unsent: List[Message] = None):
+        """
+        :param unsent: Messages not sent yet, if some were. None if no
+            message was sent.
+        :type unsent: List[Message]
+        """
+        super().__init__(message)
+        self.unsent = unsent
+
+
+class SendGridTransport:
+    """Sends mail through the SendGrid v3 API over one kept-alive connection
+
+    Messages with the same subject and body are sent in one request, with a
+    personalization per recipient.
+    """
+
+    def __init__(self, api_key: str, sender: str, timeout: float = 10):
+        self.api_key = api_key
+        self.sender = sender
+        self.timeout = timeout
+        self.conn = None
+
+    def send(self, messages: List[Message]):
+        """Sends messages
+
+        :raises TransientError: With the messages left unsent if a request
+            fails after earlier ones went out, so retries do not send twice
+        """
+        groups = {}
+        for m in messages:
+            groups.setdefault((m.subject, m.body), []).append(m)
+
+        chunks = [
+            (subject, body, group[i:i+MAX_BATCH_SIZE])
+            for (subject, body), group in groups.items()
+            for i in range(0, len(group), MAX_BATCH_SIZE)
+        ]
+        for n_sent, (subject, body, chunk) in enumerate(chunks):
+            try:
+                self.__post({
+                    'personalizations': [{'to': [{'email': m.to}]} for m in chunk],
+                    'from': {'email': self.sender},
+                    'subject': subject,
+                    'content': [{'type': 'text/plain', 'value': body}],
+                })
+            except TransientError as e:
+                if n_sent == 0:
+                    raise
+                raise TransientError(
+                    str(e), unsent=[m for _, _, rest in chunks[n_sent:] for m in rest]
+                )
+
+    def __post(self, payload: dict):
+        if self.conn == None:
+            self.conn = http.client.HTTPSConnection(
+                SENDGRID_HOST, timeout=self.timeout
+            )
+        try:
+            self.conn.request(
+                'POST',
+                '/v3/mail/send',
+                body=json.dumps(payload),
+                headers={
+                    'Authorization': f'Bearer {self.api_key}',
+                    'Content-Type': 'application/json',
+                },
+            )
+            response = self.conn.getresponse()
+            response_body = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            # Reconnect on next attempt
+            self.conn.close()
+            self.conn = None
+            raise TransientError(str(e))
+
+        if response.status == 429 or response.status >= 500:
+            raise TransientError(f'sendgrid returned {response.status}')
+        if response.status >= 400:
+            raise Exception(f'sendgrid returned {response.status}: {response_body}')
+
+
+class FileTransport:
+    """Appends mail as JSON lines to a file instead of sending it
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def send(self, messages: List[Message]):
+        with self.lock, open(self.path, 'a') as f:
+            for m in messages:
+                f.write(json.dumps({
+                    'to': m.to,
+                    'subject': m.subject,
+                    'body': m.body,
+                }))
+                f.write('\n')
+
+
+class MailQueue:
+    """Background mail queue
+
+    Messages are accepted immediately and sent in batches from a worker
+    thread, retrying transient failures with exponential backoff.
+    """
+
+    def __init__(self, transport, batch_size: int = 100, batch_wait: float = 0.05, max_retries: int = 5, backoff: float = 1):
+        """
+        :param transport: Object with a `send(messages)` method
+
+        :param batch_size: Max messages handed to transport at once
+        :type batch_size: int
+
+        :param batch_wait: Seconds to wait for more messages before sending a batch
+        :type batch_wait: float
+
+        :param max_retries: Retries before a batch is dropped
+        :type max_retries: int
+
+        :param backoff: Seconds to wait before first retry, doubled for each retry
+        :type backoff: float
+        """
+        self.transport = transport
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.queue = queue.Queue()
+        self.worker = None
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+
+    def put(self, message: Message):
+        """Queues message to be sent
+        """
+        self.__ensure_worker()
+        self.queue.put(message)
+
+    def join(self):
+        """Blocks until every queued message is sent or dropped
+        """
+        self.queue.join()
+
+    def stats(self) -> dict:
+        """Queue statistics
+        """
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'queued': self.queue.unfinished_tasks,
+        }
+
+    def __ensure_worker(self):
+        # Started lazily so importing never starts threads before a fork
+        with self.lock:
+            if self.worker == None or not self.worker.is_alive():
+                self.worker = threading.Thread(
+                    target=self.__run, name='mailer', daemon=True
+                )
+                self.worker.start()
+
+    def __run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get(
+                        timeout=max(deadline - time.monotonic(), 0)
+                    ))
+                except queue.Empty:
+                    break
+
+            try:
+                self.__send(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def __send(self, batch: List[Message]):
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                with subsystem_seconds.time('mailer.send'):
+                    self.transport.send(batch)
+                self.sent += len(batch)
+                return
+            except TransientError as e:
+                if e.unsent != None:
+                    # Only retry messages not sent yet
+                    self.sent += len(batch) - len(e.unsent)
+                    batch = e.unsent
+                if attempt == self.max_retries:
+                    logger.error('dropping %d emails after retries: %s', len(batch), e)
+                    break
+                logger.warning('retrying %d emails in %ss: %s', len(batch), delay, e)
+                time.sleep(delay)
+                delay *= 2
+            except Exception:
+                logger.exception('dropping %d emails', len(batch))
+                break
+        self.failed += len(batch)
+
+
+def transport_from_env():
+    """Transport chosen by `MAIL_TRANSPORT` environment variable
+
+    `sendgrid` (default) sends through SendGrid. `file` appends to the file
+    at `MAIL_FILE`.
+    """
+    name = os.environ.get('MAIL_TRANSPORT', 'sendgrid')
+    if name == 'sendgrid':
+        return SendGridTransport(os.environ.get('SENDGRID_API_KEY'), SENDER_EMAIL)
+    elif name == 'file':
+        return FileTransport(os.environ.get('MAIL_FILE', 'mail.jsonl'))
+    else:
+        raise Exception(f'invalid mail transport: {name}')
+
+
+mail_queue = MailQueue(transport_from_env())
+
+
+@atexit.register
+def _flush():
+    # Give queued mail a chance to go out on shutdown
+    if mail_queue.worker != None:
+        deadline = time.monotonic() + 5
+        while mail_queue.queue.unfinished_tasks > 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+
 
 def send(to: str, subject: str, body: str):
-    """Sends email
+    """Queues email to be sent
     """
-    from_email = Email(SENDER_EMAIL)
-    to_email = To(to)
-    content = Content("text/plain", body)
-    mail = Mail(from_email, to_email, subject, content)
-    response = sg.client.mail.send.post(request_body=mail.get())
-    return response
+    mail_queue.put(Message(to, subject, body))
@@ -0,0 +1,371 @@
+import bisect
+import collections
+import functools
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterator, Tuple
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra != None:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if len(pairs) > 0 else ''
+
+
+class Counter:
+    """Monotonic counter per label values
+    """
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = collections.defaultdict(float)
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self.lock:
+            self.values[label_values] += amount
+
+    def render(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} counter'
+        with self.lock:
+            items = list(self.values.items())
+        for values, value in items:
+            yield f'{self.name}{_format_labels(self.labels, values)} {value}'
+
+
+class Histogram:
+    """Bucketed distribution of observations per label values
+    """
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # Label values -> [bucket counts, sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series == None:
+                series = self.series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            if i < len(self.buckets):
+                series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *label_values) -> "_Timer":
+        """Times a block into the histogram
+        """
+        return _Timer(self, label_values)
+
+    def render(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        with self.lock:
+            items = [(values, list(s[0]), s[1], s[2]) for values, s in self.series.items()]
+        for values, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = _format_labels(self.labels, values, f'le="{bound}"')
+                yield f'{self.name}_bucket{le} {cumulative}'
+            le = _format_labels(self.labels, values, 'le="+Inf"')
+            yield f'{self.name}_bucket{le} {count}'
+            yield f'{self.name}_sum{_format_labels(self.labels, values)} {total}'
+            yield f'{self.name}_count{_format_labels(self.labels, values)} {count}'
+
+
+class _Timer:
+    __slots__ = ('histogram', 'label_values', 'start')
+
+    def __init__(self, histogram: Histogram, label_values: Tuple):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+
+
+class StatsGauge:
+    """Gauges read from `stats()` dicts of subsystems when rendered
+    """
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.sources: Dict[str, Callable[[], dict]] = {}
+
+    def add(self, subsystem: str, stats: Callable[[], dict]):
+        """Adds subsystem whose numeric stats are exported
+
+        Nested dicts, e.g. per database bind, are flattened into
+        `<key>_<stat>` names.
+        """
+        self.sources[subsystem] = stats
+
+    def render(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} gauge'
+        for subsystem, stats in list(self.sources.items()):
+            try:
+                values = stats()
+            except Exception:
+                continue
+            for stat, value in self.__flatten(values):
+                labels = _format_labels(('subsystem', 'stat'), (subsystem, stat))
+                yield f'{self.name}{labels} {value}'
+
+    def __flatten(self, values: dict, prefix: str = '') -> Iterator[Tuple[str, float]]:
+        for key, value in values.items():
+            if isinstance(value, dict):
+                yield from self.__flatten(value, f'{prefix}{key}_')
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield f'{prefix}{key}', value
+
+
+class Registry:
+    """Collection of metrics rendered together
+    """
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Metrics in Prometheus text exposition format
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+request_seconds = registry.register(Histogram(
+    'http_request_duration_seconds', 'Time to handle requests',
+    ('route', 'method', 'status'),
+))
+subsystem_seconds = registry.register(Histogram(
+    'subsystem_duration_seconds', 'Time spent in instrumented subsystem calls',
+    ('subsystem',),
+))
+subsystem_errors = registry.register(Counter(
+    'subsystem_errors_total', 'Instrumented subsystem calls that raised',
+    ('subsystem',),
+))
+query_seconds = registry.register(Histogram(
+    'db_query_duration_seconds', 'Time to execute database statements, by route',
+    ('route',),
+))
+stats = registry.register(StatsGauge(
+    'subsystem_stat', 'Statistics reported by subsystems',
+))
+
+
+def timed(subsystem: str):
+    """Decorator timing calls into `subsystem_duration_seconds`
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            except Exception:
+                subsystem_errors.inc(subsystem)
+                raise
+            finally:
+                subsystem_seconds.observe(time.perf_counter() - start, subsystem)
+        return wrapper
+    return decorator
+
+
+class SamplingProfiler:
+    """Samples stacks of all threads at an interval while running
+
+    Samples are kept as collapsed stacks, one `frame;frame;... count` line per
+    distinct stack, which flame graph tools read directly.
+    """
+
+    def __init__(self, interval: float = 0.01, max_depth: int = 64):
+        """
+        :param interval: Seconds between samples
+        :type interval: float
+
+        :param max_depth: Innermost frames kept per stack
+        :type max_depth: int
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self.counts = collections.Counter()
+        self.n_samples = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.worker = None
+
+    @property
+    def running(self) -> bool:
+        return self.worker != None and self.worker.is_alive()
+
+    def start(self):
+        """Starts sampling, clearing previous samples
+        """
+        with self.lock:
+            if self.running:
+                return
+            self.counts = collections.Counter()
+            self.n_samples = 0
+            self.stopped.clear()
+            self.worker = threading.Thread(
+                target=self.__run, name='profiler', daemon=True
+            )
+            self.worker.start()
+
+    def stop(self):
+        """Stops sampling, keeping samples
+        """
+        self.stopped.set()
+        worker = self.worker
+        if worker != None:
+            worker.join()
+
+    def collapsed(self) -> str:
+        """Samples as collapsed stacks, most frequent first
+        """
+        with self.lock:
+            items = self.counts.most_common()
+        return ''.join(f'{stack} {count}\n' for stack, count in items)
+
+    def __run(self):
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            frames = sys._current_frames()
+            with self.lock:
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    self.counts[self.__collapse(frame)] += 1
+                self.n_samples += 1
+
+    def __collapse(self, frame) -> str:
+        stack = []
+        while frame != None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+
+profiler = SamplingProfiler()
+
+
+def _route_label() -> str:
+    from flask import has_request_context, request
+    if not has_request_context():
+        return 'background'
+    rule = request.url_rule
+    return rule.rule if rule != None else 'unmatched'
+
+
+def init_app(app, db):
+    """Registers request and database statement timing and the local
+    `/metrics` endpoints
+
+    `/metrics` serves Prometheus text. `/metrics/profiler` returns collapsed
+    stacks, and POSTing `start` or `stop` as `action` toggles the profiler.
+    Endpoints only answer clients in `METRICS_ALLOW`.
+    """
+    from flask import Response, abort, g, request
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    allowed = set(app.config.get('METRICS_ALLOW', ['127.0.0.1', '::1']))
+    profiler.interval = app.config.get('PROFILER_INTERVAL', profiler.interval)
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.get('metrics_start')
+        if start != None:
+            request_seconds.observe(
+                time.perf_counter() - start,
+                _route_label(), request.method, response.status_code,
+            )
+        return response
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_start', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def record_query(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('metrics_start')
+        if starts:
+            query_seconds.observe(time.perf_counter() - starts.pop(), _route_label())
+
+    def check_allowed():
+        if request.remote_addr not in allowed:
+            abort(404)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Prometheus metrics
+        """
+        check_allowed()
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    @app.route('/metrics/profiler', methods=['GET', 'POST'])
+    def metrics_profiler():
+        """Toggles sampling profiler or returns its samples
+        """
+        check_allowed()
+        if request.method == 'POST':
+            action = request.form.get('action') or request.args.get('action')
+            if action == 'start':
+                profiler.start()
+            elif action == 'stop':
+                profiler.stop()
+            else:
+                abort(400)
+            return Response(f'profiler running: {profiler.running}\n', mimetype='text/plain')
+        return Response(profiler.collapsed(), mimetype='text/plain')
+
+    csrf = app.extensions.get('csrf')
+    if csrf != None:
+        csrf.exempt(metrics_profiler)
+
+    stats.add('db_pool', lambda: db.pool_stats(app))
+    stats.add('profiler', lambda: {
+        'running': int(profiler.running),
+        'samples': profiler.n_samples,
+    })
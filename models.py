@@ -1,5 +1,14 @@
-import bcrypt
+import json
+import random
+import time
+from typing import List, Optional, Tuple
 from app import db
+from challenge import Problem, SchedulingMethod
+from hashing import hasher
+
+# Seconds to cache number of banked problems per method and size
+BANK_COUNT_TTL = 60
+_bank_counts = {}
 
 
 class User(db.Model):
@@ -9,26 +18,119 @@ class User(db.Model):
     password_hash = db.Column(db.String(256), nullable=False)
     is_verified = db.Column(db.Boolean(), nullable=False, default=False)
     score = db.Column(db.Integer, nullable=False, default=0)
-    code = db.Column(db.String(80))
+    code = db.Column(db.String(80), index=True)
+
+    __table_args__ = (
+        # Leaderboard order, highest score first and ties by id
+        db.Index('ix_user_score_desc_id', score.desc(), id),
+    )
 
     @staticmethod
     def create_user(username: str, email: str, password: str) -> "User":
         """Creates user
         """
-        password_hash = bcrypt.hashpw(
-            password.encode('utf-8'), bcrypt.gensalt()
-        )
-        return User(username=username, email=email, password_hash=password_hash.decode('utf-8'))
+        password_hash = hasher.hash(password)
+        return User(username=username, email=email, password_hash=password_hash)
 
     def validate(self, password: str) -> bool:
         """Validates candidate password
         """
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        return hasher.check(password, self.password_hash)
 
     def set_password(self, password: str):
         """Sets user password
         """
-        password_hash = bcrypt.hashpw(
-            password.encode('utf-8'), bcrypt.gensalt()
-        )
-        self.password_hash = password_hash.decode('utf-8')
+        self.password_hash = hasher.hash(password)
+
+    def needs_rehash(self) -> bool:
+        """Checks if password hash uses an outdated cost factor
+        """
+        return hasher.needs_rehash(self.password_hash)
+
+
+class LeaderboardState(db.Model):
+    """Single row versioning the top of the leaderboard
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    # Unix time version was last bumped
+    modified_at = db.Column(db.Float, nullable=False, default=0)
+
+
+class ScoreCount(db.Model):
+    """Number of users with a score, kept in the same transaction as score
+    changes so ranks are summed over distinct scores instead of counted
+    over users
+    """
+    score = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    n = db.Column(db.Integer, nullable=False, default=0)
+
+
+class BankProblem(db.Model):
+    """Pre-generated problem with cached solution
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    method = db.Column(db.String(8), nullable=False)
+    n_processes = db.Column(db.Integer, nullable=False)
+    # Index of problem among problems with the same method and size
+    slot = db.Column(db.Integer, nullable=False)
+    problem = db.Column(db.Text, nullable=False)
+    answer = db.Column(db.Text, nullable=False)
+    # Execution timeline, missing for problems banked before timelines
+    segments = db.Column(db.Text)
+
+    __table_args__ = (
+        db.UniqueConstraint('method', 'n_processes', 'slot'),
+    )
+
+    @staticmethod
+    def count(method: SchedulingMethod, n_processes: int) -> int:
+        """Number of banked problems for method and size
+
+        Counts are cached for `BANK_COUNT_TTL` seconds.
+        """
+        key = (method, n_processes)
+        now = time.monotonic()
+        cached = _bank_counts.get(key)
+        if cached != None and now - cached[1] < BANK_COUNT_TTL:
+            return cached[0]
+
+        n = BankProblem.query.filter_by(
+            method=method, n_processes=n_processes
+        ).count()
+        _bank_counts[key] = (n, now)
+        return n
+
+    @staticmethod
+    def draw(method: SchedulingMethod, n_processes: int) -> Optional["BankProblem"]:
+        """Draws random banked problem
+
+        :return: Banked problem or None if bank has none for method and size
+        :rtype: Optional[BankProblem]
+        """
+        n = BankProblem.count(method, n_processes)
+        if n == 0:
+            return None
+        return BankProblem.query.filter_by(
+            method=method, n_processes=n_processes, slot=random.randrange(n)
+        ).first()
+
+    def to_problem(self) -> Problem:
+        """Banked problem
+        """
+        return Problem.from_json(self.problem)
+
+    def to_answer(self) -> List[Tuple[int, int]]:
+        """Cached (finish time, wait time) pairs
+        """
+        return [tuple(pair) for pair in json.loads(self.answer)]
+
+    def to_segments(self) -> Optional[List[Tuple[int, int, int]]]:
+        """Cached (process, start time, end time) timeline segments
+
+        :return: Segments, or None if not stored
+        :rtype: Optional[List[Tuple[int, int, int]]]
+        """
+        if self.segments == None:
+            return None
+        return [tuple(segment) for segment in json.loads(self.segments)]
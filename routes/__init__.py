@@ -1,41 +1,65 @@
-from flask import session, render_template, redirect, flash
+from flask import session, render_template, redirect, flash, make_response
 from flask import current_app as app
 from flask.globals import request
 from models import db, User
+from database import read_replica
+from fragment_cache import fragment_cache
+from hashing import HasherBusy
+from leaderboard import leaderboard
+from user_cache import user_cache, current_user, current_user_summary
 from utils import validate_email
 
+# Users shown on the scoreboard
+SCOREBOARD_SIZE = 20
+
+leaderboard.watch_size = SCOREBOARD_SIZE
+leaderboard.state_ttl = app.config['LEADERBOARD_STATE_TTL']
+user_cache.ttl = app.config['USER_CACHE_TTL']
+
 # Import routes
 from . import auth
 from . import challenge
+from . import grade
+from . import api
+
+
+@app.errorhandler(HasherBusy)
+def hasher_busy(e):
+    """Asks user to retry if too many passwords are being hashed
+    """
+    flash('Server is busy, please try again.', 'error')
+    return redirect(request.path)
 
 
 @app.route('/', methods=['GET'])
+@read_replica
 def home():
     """Home page
     """
 
     if 'username' in session:
-        u = User.query.filter_by(username=session['username']).first()
+        _, score = current_user_summary()
         return render_template(
             'home_auth.html',
             username=session['username'],
-            score=u.score,
+            score=score,
         )
     else:
         return render_template('home.html')
 
 
 @app.route('/about', methods=['GET'])
+@read_replica
 def about():
     """About page
     """
 
     if 'username' in session:
-        u = User.query.filter_by(username=session['username']).first()
+        _, score = current_user_summary()
         return render_template(
             'about.html',
             username=session['username'],
-            score=u.score,
+            score=score,
 
         )
     else:
@@ -45,30 +69,50 @@ def about():
 
 
 @app.route('/scoreboard', methods=['GET'])
+@read_replica
 def scoreboard():
     """Displays leaderboard
+
+    The top users table is rendered once per leaderboard version. Anonymous
+    users get the whole page from cache, with ETag and Last-Modified.
     """
 
-    # Get top 20 users
-    top_users = User.query.order_by(User.score.desc()).limit(20).all()
-    top_users = [{
-        'username': u.username,
-        'score': u.score,
-    } for u in top_users]
+    version, modified_at = leaderboard.state()
+    # Before the first bump, the render time stands in for the modified time
+    modified_at = modified_at or None
+    table = fragment_cache.get(
+        'leaderboard', version,
+        lambda: render_template(
+            'includes/leaderboard.html',
+            top_users=leaderboard.top(SCOREBOARD_SIZE),
+        ),
+        modified_at=modified_at,
+    )
 
     if 'username' in session:
-        u = User.query.filter_by(username=session['username']).first()
-        return render_template(
+        user_id, score = current_user_summary()
+        res = make_response(render_template(
             'scoreboard.html',
             username=session['username'],
-            score=u.score,
-            top_users=top_users,
-        )
+            score=score,
+            rank=leaderboard.rank(user_id, score),
+            leaderboard=table.html,
+        ))
+        res.add_etag()
+        res.cache_control.private = True
     else:
-        return render_template(
-            'scoreboard.html',
-            top_users=top_users,
+        page = fragment_cache.get(
+            'scoreboard', version,
+            lambda: render_template('scoreboard.html', leaderboard=table.html),
+            modified_at=modified_at,
         )
+        res = make_response(str(page.html))
+        res.set_etag(page.etag)
+        res.last_modified = page.modified_at
+        res.cache_control.public = True
+
+    res.cache_control.no_cache = True
+    return res.make_conditional(request)
 
 
 @app.route('/edit_profile', methods=['GET', 'POST'])
@@ -79,7 +123,7 @@ def edit_profile():
     if 'username' not in session:
         return redirect('/')
 
-    u = User.query.filter_by(username=session['username']).first()
+    u = current_user()
 
     if request.method == 'POST':
         username = request.form['username']
@@ -113,9 +157,11 @@ def edit_profile():
             return render_template('edit_profile.html')
 
         # Update profile
+        user_cache.invalidate(u.username)
         u.username = username
         u.email = email
         db.session.commit()
+        leaderboard.update(u.id, u.score)
 
         # Update session
         session['username'] = username
@@ -145,7 +191,7 @@ def change_password():
     if 'username' not in session:
         return redirect('/')
 
-    u = User.query.filter_by(username=session['username']).first()
+    u = current_user()
 
     if request.method == 'POST':
         old_password = request.form['old-password']
@@ -0,0 +1,163 @@
+import random
+from typing import List, Optional, Tuple
+from flask import request, session, jsonify
+from flask import current_app as app
+from flask_wtf.csrf import generate_csrf
+from database import read_replica
+from leaderboard import leaderboard
+from solution_cache import cache
+from user_cache import current_user_summary
+from utils import parse_int
+from . import SCOREBOARD_SIZE
+from .challenge import current_problem, new_problem, practice_problem, submit_answer
+
+# Max practice problems fetched or checked per request
+PRACTICE_BATCH_SIZE = 50
+
+
+def error(message: str, status: int):
+    return jsonify({'error': message}), status
+
+
+def cacheable(data, public: bool = False):
+    """JSON response with an ETag, answered with 304 Not Modified if the
+    client already has it
+
+    :param public: Whether shared caches may store the response
+    :type public: bool
+    """
+    res = jsonify(data)
+    res.add_etag()
+    res.cache_control.no_cache = True
+    if public:
+        res.cache_control.public = True
+    else:
+        res.cache_control.private = True
+    return res.make_conditional(request)
+
+
+def parse_answer(data) -> Optional[List[Tuple[Optional[int], Optional[int]]]]:
+    """Parses a list of [finish time, wait time] pairs
+
+    :return: Pairs, or None if answer is not a list
+    :rtype: Optional[List[Tuple[Optional[int], Optional[int]]]]
+    """
+    if not isinstance(data, list):
+        return None
+    answer = []
+    for pair in data:
+        if isinstance(pair, list) and len(pair) == 2:
+            answer.append((parse_int(str(pair[0])), parse_int(str(pair[1]))))
+        else:
+            answer.append((None, None))
+    return answer
+
+
+@app.route('/api/challenge', methods=['GET', 'POST'])
+def api_challenge():
+    """Current problem, or submits answer to it
+
+    POST takes `{"answer": [[finish, wait], ...]}` with the CSRF token, given
+    by GET, in the `X-CSRFToken` header.
+    """
+    if 'username' not in session:
+        return error('not logged in', 401)
+
+    if request.method == 'GET':
+        problem, _, _ = current_problem()
+        if problem == None:
+            problem = new_problem()
+        seed = session.get('problem_seed')
+        return jsonify({
+            'problem': problem.to_dict(),
+            'seed': str(seed) if seed != None else None,
+            'csrf_token': generate_csrf(),
+        })
+
+    data = request.get_json(silent=True)
+    answer = parse_answer(data.get('answer') if isinstance(data, dict) else None)
+    if answer == None:
+        return error('answer must be a list of [finish, wait] pairs', 400)
+
+    res = submit_answer(answer)
+    if res == None:
+        return error('no current problem', 409)
+
+    return jsonify({
+        'correct': res['is_correct'],
+        'practice': res['is_practice'],
+        'answer': res['answer'],
+        'timeline': res['segments'],
+        'score': res['score'],
+    })
+
+
+@app.route('/api/score', methods=['GET'])
+@read_replica
+def api_score():
+    """Score and rank of user
+    """
+    if 'username' not in session:
+        return error('not logged in', 401)
+
+    user_id, score = current_user_summary()
+    return cacheable({
+        'username': session['username'],
+        'score': score,
+        'rank': leaderboard.rank(user_id, score),
+    })
+
+
+@app.route('/api/scoreboard', methods=['GET'])
+@read_replica
+def api_scoreboard():
+    """Top users, the same for everyone so shared caches can keep it
+    """
+    return cacheable({'top_users': leaderboard.top(SCOREBOARD_SIZE)}, public=True)
+
+
+@app.route('/api/practice', methods=['GET', 'POST'])
+def api_practice():
+    """Batch of practice problems, or checks answers to them
+
+    GET takes `n` and returns that many problems with their seeds, given as
+    strings since they do not fit in JavaScript numbers. POST
+    takes `{"answers": [{"seed": ..., "answer": [[finish, wait], ...]}, ...]}`
+    and returns whether each is correct along with the solution. Practice
+    problems never award points.
+    """
+    if 'username' not in session:
+        return error('not logged in', 401)
+
+    if request.method == 'GET':
+        n = parse_int(request.args.get('n', '1'))
+        if n == None or n < 1 or n > PRACTICE_BATCH_SIZE:
+            return error(f'n must be between 1 and {PRACTICE_BATCH_SIZE}', 400)
+
+        problems = []
+        for _ in range(n):
+            seed = random.getrandbits(64)
+            problems.append({'seed': str(seed), 'problem': practice_problem(seed).to_dict()})
+        return jsonify({'problems': problems, 'csrf_token': generate_csrf()})
+
+    data = request.get_json(silent=True)
+    answers = data.get('answers') if isinstance(data, dict) else None
+    if not isinstance(answers, list) or len(answers) > PRACTICE_BATCH_SIZE:
+        return error(f'answers must be a list of at most {PRACTICE_BATCH_SIZE} items', 400)
+
+    results = []
+    for item in answers:
+        seed = parse_int(str(item.get('seed'))) if isinstance(item, dict) else None
+        answer = parse_answer(item.get('answer') if isinstance(item, dict) else None)
+        if seed == None or seed < 0 or seed >= 1 << 64 or answer == None:
+            return error('each answer needs a seed and a list of [finish, wait] pairs', 400)
+
+        expected = cache.solve(practice_problem(seed))
+        results.append({
+            'seed': str(seed),
+            'correct': len(answer) >= len(expected) and all(
+                guess == tuple(pair) for guess, pair in zip(answer, expected)
+            ),
+            'answer': expected,
+        })
+    return jsonify({'results': results})
@@ -1,6 +1,8 @@
 from flask import request, session, redirect, render_template, flash
 from flask import current_app as app
 from models import db, User
+from hashing import HasherBusy
+from leaderboard import leaderboard
 from mailer import send
 from utils import validate_email, generate_code
 
@@ -54,7 +56,9 @@ def sign_up():
             u = User.create_user(
                 username=username, email=email, password=password)
             db.session.add(u)
+            leaderboard.move([(None, 0)])
             db.session.commit()
+            leaderboard.update(u.id, u.score)
         except:
             flash('Error occured during sign up.', 'error')
             return render_template('signup.html')
@@ -90,6 +94,15 @@ def login():
             flash('Username or password was incorrect.', 'error')
             return render_template('login.html')
 
+        # Rehash password if cost factor changed
+        # Best effort, retried on a later login if hasher is busy
+        if u.needs_rehash():
+            try:
+                u.set_password(password)
+                db.session.commit()
+            except HasherBusy:
+                pass
+
         # Log user in
         session['username'] = u.username
         return redirect('/')
@@ -1,9 +1,189 @@
 import random
+import hashlib
+import datetime
+import functools
+from typing import List, Optional, Tuple
 from flask import request, session, redirect, render_template
 from flask import current_app as app
-from challenge import Problem, SchedulingMethod, Solver
+from challenge import BASIC_METHODS, Problem
 from utils import parse_int
-from models import db, User
+from models import BankProblem
+from solution_cache import cache
+from scores import award_points
+from user_cache import current_user_summary
+
+N_PROCESSES = 3
+
+# Number of seeded problems to keep solved in memory
+SEEDED_CACHE_SIZE = 1024
+
+# Max timeline segments to label with their start times
+GANTT_TICK_LIMIT = 40
+
+
+def daily_seed(day: datetime.date) -> int:
+    """Seed of the daily challenge, the same on every node
+    """
+    digest = hashlib.sha256(f'daily:{day.isoformat()}'.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def practice_problem(seed: int) -> Problem:
+    """Problem of seed, as given by seeded challenges
+    """
+    return Problem.from_seed(seed, n_processes=N_PROCESSES, unique=True)
+
+
+@functools.lru_cache(maxsize=SEEDED_CACHE_SIZE)
+def seeded_problem(seed: int) -> Tuple[Problem, List[Tuple[int, int]], List[Tuple[int, int, int]]]:
+    """Generates and solves problem of seed once per worker
+
+    :return: (problem, answer, timeline segments) triple
+    :rtype: Tuple[Problem, List[Tuple[int, int]], List[Tuple[int, int, int]]]
+    """
+    problem = practice_problem(seed)
+    ans, segments = cache.solve_timeline(problem)
+    return problem, ans, segments
+
+
+def gantt(segments: List[Tuple[int, int, int]]) -> dict:
+    """Lays out timeline segments as a Gantt chart
+
+    :param segments: (process, start time, end time) segments in time order
+    :type segments: List[Tuple[int, int, int]]
+
+    :return: Chart with `start` and `end` times, `bars` with each segment's
+        process, times and left offset and width as percentages, and `ticks`
+        of labeled times and their offsets
+    :rtype: dict
+    """
+    if len(segments) == 0:
+        return {'start': 0, 'end': 0, 'bars': [], 'ticks': []}
+
+    start_t = segments[0][1]
+    end_t = segments[-1][2]
+    span = end_t - start_t
+
+    bars = []
+    for p, seg_start, seg_end in segments:
+        bars.append({
+            'process': p,
+            'start': seg_start,
+            'end': seg_end,
+            'left': round(100 * (seg_start - start_t) / span, 4),
+            'width': round(100 * (seg_end - seg_start) / span, 4),
+        })
+
+    ticks = []
+    if len(segments) <= GANTT_TICK_LIMIT:
+        times = sorted({t for _, s, e in segments for t in (s, e)})
+        ticks = [{'time': t, 'left': round(100 * (t - start_t) / span, 4)} for t in times]
+
+    return {'start': start_t, 'end': end_t, 'bars': bars, 'ticks': ticks}
+
+
+def clear_problem():
+    """Clears current problem
+    """
+    session['problem'] = None
+    session['problem_id'] = None
+    session['problem_seed'] = None
+
+
+def set_seeded_problem(seed: int):
+    """Makes problem of seed the current problem
+    """
+    clear_problem()
+    session['problem_seed'] = seed
+
+
+def new_problem() -> Problem:
+    """Draws new problem from problem bank, or generates one if bank is empty
+
+    Only the id of banked problems is stored in the session, others are
+    stored as a compact token.
+    """
+    method = random.choice(BASIC_METHODS)
+    banked = BankProblem.draw(method, N_PROCESSES)
+    if banked != None:
+        session['problem_id'] = banked.id
+        return banked.to_problem()
+
+    problem = Problem.generate(method, n_processes=N_PROCESSES, unique=True)
+    session['problem'] = problem.to_token()
+    return problem
+
+
+def current_problem() -> Tuple[Optional[Problem], Optional[List[Tuple[int, int]]], Optional[List[Tuple[int, int, int]]]]:
+    """Gets current problem and its answer and timeline segments if known
+
+    Banked and seeded problems come with their answer, and with segments
+    unless banked before timelines were stored.
+
+    :return: (problem, answer, segments) triple. Problem is None if there is
+        no current problem.
+    :rtype: Tuple[Optional[Problem], Optional[List[Tuple[int, int]]], Optional[List[Tuple[int, int, int]]]]
+    """
+    if session.get('problem_seed') != None:
+        return seeded_problem(session['problem_seed'])
+    if session.get('problem_id') != None:
+        banked = BankProblem.query.get(session['problem_id'])
+        if banked != None:
+            return banked.to_problem(), banked.to_answer(), banked.to_segments()
+    if session.get('problem') != None:
+        if session['problem'].startswith('{'):
+            # Sessions from before problem tokens
+            return Problem.from_json(session['problem']), None, None
+        return Problem.from_token(session['problem']), None, None
+    return None, None, None
+
+
+def submit_answer(guesses: List[Tuple[Optional[int], Optional[int]]]) -> Optional[dict]:
+    """Checks guesses against current problem, awards points and clears it
+
+    :param guesses: (finish time, wait time) guesses for each process
+    :type guesses: List[Tuple[Optional[int], Optional[int]]]
+
+    :return: Result with `problem`, `answer`, timeline `segments`,
+        `is_correct`, `is_practice` and the user's new `score`, or None if
+        there is no current problem
+    :rtype: Optional[dict]
+    """
+    problem, ans, segments = current_problem()
+    if problem == None:
+        return None
+
+    # Solve problem if not banked or seeded
+    if ans == None:
+        ans, segments = cache.solve_timeline(problem)
+    elif segments == None:
+        # Banked before timelines were stored, skip the timeline rather
+        # than solving again
+        segments = []
+
+    is_correct = len(guesses) >= len(ans) and all(
+        tuple(guess) == tuple(pair) for guess, pair in zip(guesses, ans)
+    )
+
+    # Award points
+    # Correct, 1 point
+    # Incorrect or seeded, 0 points
+    # Seeded problems can be replayed, so they are practice only
+    is_practice = session.get('problem_seed') != None
+    user_id, score = current_user_summary()
+    if is_correct and not is_practice:
+        score = award_points(user_id, session['username'], score)
+
+    clear_problem()
+
+    return {
+        'problem': problem,
+        'answer': ans,
+        'segments': segments,
+        'is_correct': is_correct,
+        'is_practice': is_practice,
+        'score': score,
+    }
 
 
 @app.route('/challenge', methods=['POST', 'GET'])
@@ -17,63 +197,66 @@ def challenge():
     if request.method == 'GET':
         # Display challenge
         # Request challenge if no current problem
-        if 'problem' not in session or session['problem'] == None:
-            method = random.choice(list(SchedulingMethod))
-            problem = Problem.generate(method, n_processes=3)
-            session['problem'] = problem.to_json()
-        else:
-            problem = Problem.from_json(session['problem'])
+        problem, _, _ = current_problem()
+        if problem == None:
+            problem = new_problem()
 
-        u = User.query.filter_by(username=session['username']).first()
+        _, score = current_user_summary()
 
         return render_template(
             'challenge.html',
             username=session['username'],
             problem=problem,
-            score=u.score
+            seed=session.get('problem_seed'),
+            score=score
         )
 
     else:
         # Submit challenge
         # Request new problem if no current problem
-        if 'problem' not in session or session['problem'] == None:
+        problem, _, _ = current_problem()
+        if problem == None:
             return redirect('/challenge')
 
-        problem = Problem.from_json(session['problem'])
+        # Parse input
+        guesses = [
+            (parse_int(request.form[f'finish_{i}']), parse_int(request.form[f'wait_{i}']))
+            for i in range(len(problem.times))
+        ]
+        res = submit_answer(guesses)
+
+        return render_template(
+            'challenge_done.html',
+            username=session['username'],
+            problem=res['problem'],
+            is_correct=res['is_correct'],
+            is_practice=res['is_practice'],
+            answer_times=res['answer'],
+            gantt=gantt(res['segments']),
+            score=res['score'],
+        )
 
-        # Solve problem
-        solver = Solver(problem)
-        ans = solver.solve()
 
-        # Parse and validate input
-        is_correct = True
-        for i, (finish_t, wait_t) in enumerate(ans):
-            finish_t_guess = parse_int(request.form[f'finish_{i}'])
-            if finish_t_guess != finish_t:
-                is_correct = False
-                break
+@app.route('/challenge/daily', methods=['GET'])
+def daily_challenge():
+    """Gives every user the same problem for the current UTC day
+    """
+    if 'username' not in session:
+        return redirect('/login')
+
+    set_seeded_problem(daily_seed(datetime.datetime.utcnow().date()))
+    return redirect('/challenge')
 
-            wait_t_guess = parse_int(request.form[f'wait_{i}'])
-            if wait_t_guess != wait_t:
-                is_correct = False
-                break
 
-        # Award points
-        # Correct, 1 point
-        # Incorrect, 0 points
-        u = User.query.filter_by(username=session['username']).first()
-        if is_correct:
-            u.score += 1
-            db.session.commit()
+@app.route('/challenge/seed/<int:seed>', methods=['GET'])
+def seeded_challenge(seed: int):
+    """Gives user the problem of a shared seed
+    """
+    if 'username' not in session:
+        return redirect('/login')
 
-        # Reset problem
-        session['problem'] = None
+    if seed >= 1 << 64:
+        return redirect('/challenge')
 
-        return render_template(
-            'challenge_done.html',
-            username=session['username'],
-            problem=problem,
-            is_correct=is_correct,
-            answer_times=ans,
-            score=u.score,
-        )
+    set_seeded_problem(seed)
+    return redirect('/challenge')
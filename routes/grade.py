@@ -0,0 +1,55 @@
+import io
+from flask import request, session, redirect, render_template, flash, Response, stream_with_context
+from flask import current_app as app
+from grader import PARSERS, grade_stream
+from solution_cache import cache
+from user_cache import current_user_summary
+
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+@app.route('/grade', methods=['GET', 'POST'])
+def grade():
+    """Bulk grade uploaded answer sheets
+
+    Results are streamed back as a download while the upload is read line by line.
+    """
+    if 'username' not in session:
+        return redirect('/login')
+
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if upload == None or upload.filename == '':
+            flash('Submissions file is required.', 'error')
+            return redirect('/grade')
+
+        fmt = request.form.get('format') or (
+            'csv' if upload.filename.endswith('.csv') else 'jsonl'
+        )
+        if fmt not in PARSERS:
+            flash('Format is invalid.', 'error')
+            return redirect('/grade')
+
+        lines = io.TextIOWrapper(upload.stream, encoding='utf-8', newline='')
+        chunks = grade_stream(
+            lines, fmt, cache,
+            max_processes=app.config['GRADE_MAX_PROCESSES'],
+            max_steps=app.config['GRADE_MAX_STEPS'],
+        )
+        return Response(
+            stream_with_context(chunks),
+            mimetype=CONTENT_TYPES[fmt],
+            headers={
+                'Content-Disposition': f'attachment; filename=results.{fmt}',
+            },
+        )
+
+    _, score = current_user_summary()
+    return render_template(
+        'grade.html',
+        username=session['username'],
+        score=score,
+    )
@@ -0,0 +1,152 @@
+import atexit
+import logging
+import threading
+from typing import Dict, Tuple
+from sqlalchemy import bindparam
+from models import db, User
+from leaderboard import leaderboard
+from user_cache import user_cache
+
+logger = logging.getLogger(__name__)
+
+
+def increment_score(user_id: int, amount: int = 1) -> int:
+    """Atomically adds to user's score
+
+    Runs a single `UPDATE ... SET score = score + amount` so concurrent
+    increments are never lost, returning the new score with RETURNING where
+    the database supports it.
+
+    :return: New score
+    :rtype: int
+    """
+    table = User.__table__
+    stmt = table.update().where(table.c.id == user_id).values(
+        score=table.c.score + amount
+    )
+    if db.engine.dialect.implicit_returning:
+        score = db.session.execute(stmt.returning(table.c.score)).scalar()
+    else:
+        db.session.execute(stmt)
+        score = db.session.query(User.score).filter(User.id == user_id).scalar()
+    if score != None:
+        leaderboard.move([(score - amount, score)])
+    db.session.commit()
+    return score
+
+
+class ScoreBuffer:
+    """Write-behind buffer of score increments
+
+    Increments are coalesced per user and flushed every `interval` seconds
+    in one batched UPDATE.
+    """
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.app = None
+        self.pending: Dict[int, Tuple[str, int]] = {}  # User id -> (username, amount)
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.worker = None
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get('SCORE_FLUSH_INTERVAL', self.interval)
+
+    def add(self, user_id: int, username: str, amount: int = 1) -> int:
+        """Buffers score increment
+
+        :return: Amount pending for user
+        :rtype: int
+        """
+        self.__ensure_worker()
+        with self.lock:
+            _, pending = self.pending.get(user_id, (username, 0))
+            self.pending[user_id] = (username, pending + amount)
+            return pending + amount
+
+    def flush(self):
+        """Writes pending increments
+        """
+        with self.flush_lock:
+            with self.lock:
+                pending = self.pending
+                self.pending = {}
+            if len(pending) == 0:
+                return
+
+            table = User.__table__
+            stmt = table.update().where(table.c.id == bindparam('user_id')).values(
+                score=table.c.score + bindparam('amount')
+            )
+            try:
+                with self.app.app_context():
+                    db.session.execute(stmt, [
+                        {'user_id': user_id, 'amount': amount}
+                        for user_id, (_, amount) in pending.items()
+                    ])
+                    rows = db.session.query(User.id, User.score).filter(
+                        User.id.in_(list(pending))
+                    ).all()
+                    leaderboard.move(
+                        (score - pending[user_id][1], score) for user_id, score in rows
+                    )
+                    db.session.commit()
+
+                    leaderboard.update_many(rows)
+            except Exception:
+                logger.exception('failed to flush %d score increments', len(pending))
+                # Keep increments for next flush
+                with self.lock:
+                    for user_id, (username, amount) in pending.items():
+                        _, newer = self.pending.get(user_id, (username, 0))
+                        self.pending[user_id] = (username, amount + newer)
+                return
+
+            for username, _ in pending.values():
+                user_cache.invalidate(username)
+
+    def __ensure_worker(self):
+        with self.lock:
+            if self.worker == None or not self.worker.is_alive():
+                self.worker = threading.Thread(
+                    target=self.__run, name='score-flush', daemon=True
+                )
+                self.worker.start()
+
+    def __run(self):
+        while not self.stopped.wait(self.interval):
+            self.flush()
+
+
+score_buffer = ScoreBuffer()
+
+
+@atexit.register
+def _flush():
+    if score_buffer.app != None:
+        score_buffer.flush()
+
+
+def award_points(user_id: int, username: str, score: int, amount: int = 1) -> int:
+    """Adds to user's score
+
+    Uses the write-behind buffer if `SCORE_WRITE_BEHIND` is set, otherwise
+    updates the database immediately.
+
+    :param score: Last known score of user
+    :type score: int
+
+    :return: New score. Estimated from last known score if buffered.
+    :rtype: int
+    """
+    if score_buffer.app != None and score_buffer.app.config.get('SCORE_WRITE_BEHIND'):
+        pending = score_buffer.add(user_id, username, amount)
+        return score + pending
+
+    score = increment_score(user_id, amount)
+    user_cache.invalidate(username)
+    leaderboard.update(user_id, score)
+    return score
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from challenge import PRIORITY_METHODS, QUANTUM_METHODS, Problem, Solver
+
+DEFAULT_MAX_SIZE = 10000
+
+
+def problem_key(problem: Problem) -> str:
+    """Canonical hash of problem
+
+    :param problem: Problem
+    :type problem: Problem
+
+    :return: SHA-256 hex digest of canonical (method, times, quantum, priorities) JSON
+    :rtype: str
+    """
+    data = json.loads(problem.to_json())
+    # Quantum and priorities are ignored by methods that do not use them
+    if data['method'] not in QUANTUM_METHODS:
+        data['quantum'] = 0
+    if data['method'] not in PRIORITY_METHODS:
+        data.pop('priorities', None)
+    payload = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class MemoryBackend:
+    """In-process LRU backend
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            value = self.entries.get(key)
+            if value != None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def size(self) -> int:
+        return len(self.entries)
+
+
+class SqliteBackend:
+    """On-disk LRU backend shared by every process using the same file
+
+    Least recently used entries are evicted every `evict_every` puts, so the
+    cache may briefly hold up to that many entries over `max_size`.
+
+    Hits only refresh an entry's last use if it is older than
+    `touch_interval` seconds, so most reads never take the write lock.
+    """
+
+    def __init__(self, path: str, max_size: int = DEFAULT_MAX_SIZE, evict_every: int = 64, touch_interval: float = 60):
+        self.path = path
+        self.max_size = max_size
+        self.evict_every = evict_every
+        self.touch_interval = touch_interval
+        self.evictions = 0
+        self.n_puts = 0
+        self.local = threading.local()
+
+        conn = self.connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS solution '
+            '(key TEXT PRIMARY KEY, answer TEXT NOT NULL, used REAL NOT NULL)'
+        )
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS ix_solution_used ON solution (used)'
+        )
+        conn.commit()
+
+    def connect(self) -> sqlite3.Connection:
+        """Connection for current thread
+        """
+        conn = getattr(self.local, 'conn', None)
+        if conn == None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        conn = self.connect()
+        row = conn.execute(
+            'SELECT answer, used FROM solution WHERE key = ?', (key,)
+        ).fetchone()
+        if row == None:
+            return None
+        now = time.time()
+        if now - row[1] > self.touch_interval:
+            conn.execute(
+                'UPDATE solution SET used = ? WHERE key = ?', (now, key)
+            )
+            conn.commit()
+        return row[0]
+
+    def put(self, key: str, value: str):
+        conn = self.connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO solution (key, answer, used) VALUES (?, ?, ?)',
+            (key, value, time.time()),
+        )
+        self.n_puts += 1
+        if self.n_puts % self.evict_every == 0:
+            n_over = self.size() - self.max_size
+            if n_over > 0:
+                conn.execute(
+                    'DELETE FROM solution WHERE key IN '
+                    '(SELECT key FROM solution ORDER BY used LIMIT ?)',
+                    (n_over,),
+                )
+                self.evictions += n_over
+        conn.commit()
+
+    def size(self) -> int:
+        return self.connect().execute('SELECT COUNT(*) FROM solution').fetchone()[0]
+
+
+class SolutionCache:
+    """Bounded cache of solved problems
+    """
+
+    def __init__(self, backend=None):
+        """
+        :param backend: Storage backend. Defaults to an in-process LRU.
+        :type backend: Union[MemoryBackend, SqliteBackend]
+        """
+        self.backend = backend if backend != None else MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Configures backend from app config
+
+        Uses an on-disk backend shared across workers if
+        `SOLUTION_CACHE_PATH` is set.
+        """
+        max_size = app.config.get('SOLUTION_CACHE_SIZE', DEFAULT_MAX_SIZE)
+        path = app.config.get('SOLUTION_CACHE_PATH')
+        if path:
+            self.backend = SqliteBackend(path, max_size=max_size)
+        else:
+            self.backend = MemoryBackend(max_size=max_size)
+
+    def solve(self, problem: Problem) -> List[Tuple[int, int]]:
+        """Solves for finish and wait times, using cached answer if any
+
+        :return: List of (finish time, wait time) pairs
+        :rtype: List[Tuple[int, int]]
+        """
+        key = problem_key(problem)
+        cached = self.backend.get(key)
+        if cached != None:
+            self.hits += 1
+            return [tuple(pair) for pair in json.loads(cached)]
+
+        self.misses += 1
+        ans = Solver(problem).solve()
+        self.backend.put(key, json.dumps(ans))
+        return ans
+
+    def solve_timeline(self, problem: Problem) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int, int]]]:
+        """Solves for finish and wait times and execution timeline, using
+        cached results if any
+
+        :return: (answer, segments) pair, where segments are
+            (process, start time, end time) in time order
+        :rtype: Tuple[List[Tuple[int, int]], List[Tuple[int, int, int]]]
+        """
+        key = problem_key(problem)
+        cached = self.backend.get(f'timeline:{key}')
+        if cached != None:
+            self.hits += 1
+            data = json.loads(cached)
+            return (
+                [tuple(pair) for pair in data['answer']],
+                [tuple(segment) for segment in data['segments']],
+            )
+
+        self.misses += 1
+        solver = Solver(problem, keep_timeline=True)
+        ans = solver.solve()
+        segments = solver.timeline.to_list()
+        self.backend.put(f'timeline:{key}', json.dumps({
+            'answer': ans,
+            'segments': segments,
+        }))
+        self.backend.put(key, json.dumps(ans))
+        return ans, segments
+
+    def stats(self) -> dict:
+        """Cache statistics
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.backend.evictions,
+            'size': self.backend.size(),
+            'max_size': self.backend.max_size,
+        }
+
+
+cache = SolutionCache()
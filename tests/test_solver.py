@@ -0,0 +1,168 @@
+import random
+import unittest
+from typing import List, Optional, Tuple
+from batch import solve_batch
+from challenge import BASIC_METHODS, Problem, SchedulingMethod, Solver, find_ties
+
+# Problems checked per case
+N_PROBLEMS = 2000
+
+
+def reference_solve(method: SchedulingMethod, times: List[Tuple[int, int]], quantum: int = 0) -> List[Tuple[int, int]]:
+    """Finish and wait times from the original scalar solver
+
+    Kept as close to the original as possible, including its linear scans
+    over sets, so faster solvers can be checked against it.
+    """
+    n_processes = len(times)
+    time_left = [exec_t for _, exec_t in times]
+    pending_arrivals = set(range(n_processes))
+    pending_completion = set()
+    events: List[Tuple[int, List[Optional[int]]]] = []
+
+    def log(t: int, *processes: int):
+        state = [None] * n_processes
+        for p in processes:
+            state[p] = time_left[p]
+        events.append((t, state))
+
+    def find_next_arrival() -> Tuple[Optional[int], float]:
+        best_p, best_t = None, float('inf')
+        for p in pending_arrivals:
+            if times[p][0] < best_t:
+                best_p, best_t = p, times[p][0]
+        return best_p, best_t
+
+    def find_next_shortest() -> int:
+        return min(pending_completion, key=lambda p: time_left[p])
+
+    process_q = []
+    n_finished = 0
+    time_remaining = quantum
+    curr_p = None
+    curr_t = 0
+    while n_finished < n_processes:
+        if curr_p == None:
+            curr_p, curr_t = find_next_arrival()
+            pending_arrivals.remove(curr_p)
+            pending_completion.add(curr_p)
+            log(curr_t, curr_p)
+            continue
+
+        next_arrival_p, next_arrival_t = find_next_arrival()
+        finish_curr_t = curr_t + time_left[curr_p]
+        if method == SchedulingMethod.RR:
+            next_t = min(next_arrival_t, finish_curr_t, curr_t + time_remaining)
+        else:
+            next_t = min(next_arrival_t, finish_curr_t)
+
+        dt = next_t - curr_t
+        time_left[curr_p] -= dt
+        curr_t += dt
+        if method == SchedulingMethod.RR:
+            time_remaining -= dt
+
+        if next_t == next_arrival_t:
+            log(curr_t, curr_p, next_arrival_p)
+            pending_arrivals.remove(next_arrival_p)
+            pending_completion.add(next_arrival_p)
+            if method in (SchedulingMethod.FCFS, SchedulingMethod.RR):
+                process_q.append(next_arrival_p)
+            elif method == SchedulingMethod.SRTF and time_left[next_arrival_p] < time_left[curr_p]:
+                curr_p = next_arrival_p
+        elif next_t == finish_curr_t:
+            if method == SchedulingMethod.RR:
+                time_remaining = quantum
+            pending_completion.remove(curr_p)
+            n_finished += 1
+            if len(pending_completion) > 0:
+                if method in (SchedulingMethod.FCFS, SchedulingMethod.RR):
+                    next_p = process_q.pop(0)
+                else:
+                    next_p = find_next_shortest()
+                log(curr_t, curr_p, next_p)
+                curr_p = next_p
+            else:
+                log(curr_t, curr_p)
+                curr_p = None
+        else:
+            # RR quantum is up
+            time_remaining = quantum
+            process_q.append(curr_p)
+            next_p = process_q.pop(0)
+            log(curr_t, curr_p, next_p)
+            curr_p = next_p
+
+    res = []
+    for p in range(n_processes):
+        finish_t = 0
+        for t, state in events:
+            if state[p] == 0:
+                finish_t = t
+
+        wait_t = 0
+        start_idx = 0
+        while events[start_idx][1][p] == None:
+            start_idx += 1
+        for i in range(start_idx, len(events) - 1):
+            t, state = events[i]
+            next_t, next_state = events[i + 1]
+            if state[p] == 0:
+                break
+            # Not waiting if time left is logged in both events and changes
+            if state[p] != None and next_state[p] != None and state[p] != next_state[p]:
+                continue
+            wait_t += next_t - t
+        res.append((finish_t, wait_t))
+    return res
+
+
+def random_problems(seed: int, max_processes: int, max_arrival: int, max_exec: int, unique: bool = False) -> List[Problem]:
+    """Seeded problems of the basic methods
+
+    :param unique: Whether to drop problems with tie points
+    :type unique: bool
+    """
+    rng = random.Random(seed)
+    problems = []
+    for _ in range(N_PROBLEMS):
+        method = rng.choice(BASIC_METHODS)
+        n_processes = rng.randint(0, max_processes)
+        times = [(rng.randint(0, max_arrival), rng.randint(1, max_exec)) for _ in range(n_processes)]
+        problem = Problem(method, times, quantum=rng.randint(1, 5))
+        if not unique or len(find_ties(problem, first_only=True)) == 0:
+            problems.append(problem)
+    return problems
+
+
+class SolverTest(unittest.TestCase):
+    """Differential tests of the solvers against the original scalar solver
+    """
+
+    def setUp(self):
+        # The original breaks ties in index order for up to 8 processes, and
+        # by set layout beyond that, so larger problems must not have ties
+        self.problems = random_problems(1, 8, 15, 8) + random_problems(2, 40, 1000, 50, unique=True)
+        self.expected = [
+            reference_solve(SchedulingMethod(p.method), p.times, p.quantum)
+            for p in self.problems
+        ]
+
+    def test_solver(self):
+        for problem, expected in zip(self.problems, self.expected):
+            with self.subTest(problem=problem.to_json()):
+                self.assertEqual(Solver(problem).solve(), expected)
+
+    def test_event_log_replay(self):
+        for problem, expected in zip(self.problems, self.expected):
+            with self.subTest(problem=problem.to_json()):
+                solver = Solver(problem, keep_events=True)
+                solver.solve()
+                self.assertEqual(solver.logger.events.solve(), expected)
+
+    def test_solve_batch(self):
+        self.assertEqual(solve_batch(self.problems), self.expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
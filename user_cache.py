@@ -0,0 +1,81 @@
+import threading
+import time
+from typing import Optional, Tuple
+from flask import g, session
+from models import User
+
+DEFAULT_TTL = 5
+
+
+class UserCache:
+    """Short-lived cache of username -> (user id, score)
+
+    Entries must be invalidated when a user's username or score is committed.
+    Other workers may show a stale score for up to `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, username: str) -> Optional[Tuple[int, int]]:
+        """Gets cached (user id, score) pair
+
+        :return: (user id, score) pair or None if not cached or expired
+        :rtype: Optional[Tuple[int, int]]
+        """
+        entry = self.entries.get(username)
+        if entry == None:
+            return None
+        user_id, score, expires = entry
+        if time.monotonic() > expires:
+            with self.lock:
+                self.entries.pop(username, None)
+            return None
+        return user_id, score
+
+    def put(self, username: str, user_id: int, score: int):
+        if self.ttl <= 0:
+            return
+        with self.lock:
+            self.entries[username] = (user_id, score, time.monotonic() + self.ttl)
+
+    def invalidate(self, username: str):
+        with self.lock:
+            self.entries.pop(username, None)
+
+
+user_cache = UserCache()
+
+
+def current_user() -> Optional[User]:
+    """Logged in user, queried at most once per request
+
+    :return: User or None if not logged in
+    :rtype: Optional[User]
+    """
+    if 'username' not in session:
+        return None
+    if 'user' not in g:
+        g.user = User.query.filter_by(username=session['username']).first()
+        if g.user != None:
+            user_cache.put(g.user.username, g.user.id, g.user.score)
+    return g.user
+
+
+def current_user_summary() -> Optional[Tuple[int, int]]:
+    """Logged in user's id and score, from cache if possible
+
+    :return: (user id, score) pair or None if not logged in
+    :rtype: Optional[Tuple[int, int]]
+    """
+    if 'username' not in session:
+        return None
+    cached = user_cache.get(session['username'])
+    if cached != None:
+        return cached
+    u = current_user()
+    if u == None:
+        return None
+    return u.id, u.score
@@ -0,0 +1,152 @@
+import itertools
+import math
+import random
+from typing import Callable, Dict, Iterator, Tuple
+
+
+class ExponentialArrivals:
+    """Poisson arrivals, with exponentially distributed gaps between processes
+    """
+
+    def __init__(self, mean_gap: float = 2.0, start: int = 1):
+        """
+        :param mean_gap: Mean time between arrivals
+        :type mean_gap: float
+
+        :param start: Arrival time of first process
+        :type start: int
+        """
+        self.mean_gap = mean_gap
+        self.start = start
+
+    def __call__(self, rng: random.Random) -> Iterator[int]:
+        t = float(self.start)
+        while True:
+            yield int(t)
+            t += rng.expovariate(1 / self.mean_gap)
+
+
+class BurstyArrivals:
+    """Bursts of arrivals separated by heavy-tailed idle gaps
+
+    Burst sizes are geometric with mean `mean_burst`, processes in a burst
+    arrive `burst_gap` apart, and gaps between bursts are Pareto distributed.
+    """
+
+    def __init__(self, mean_burst: float = 5.0, burst_gap: int = 0, alpha: float = 1.5, min_gap: float = 2.0, start: int = 1):
+        """
+        :param mean_burst: Mean number of processes per burst, at least 1
+        :type mean_burst: float
+
+        :param burst_gap: Time between arrivals in a burst
+        :type burst_gap: int
+
+        :param alpha: Pareto shape of gaps between bursts, lower is heavier tailed
+        :type alpha: float
+
+        :param min_gap: Shortest gap between bursts
+        :type min_gap: float
+
+        :param start: Arrival time of first process
+        :type start: int
+        """
+        if mean_burst < 1:
+            raise Exception('mean burst size must be at least 1')
+        self.mean_burst = mean_burst
+        self.burst_gap = burst_gap
+        self.alpha = alpha
+        self.min_gap = min_gap
+        self.start = start
+
+    def __call__(self, rng: random.Random) -> Iterator[int]:
+        t = self.start
+        while True:
+            size = 1
+            if self.mean_burst > 1:
+                # Geometric number of extra processes
+                size += int(math.log(1 - rng.random()) / math.log(1 - 1 / self.mean_burst))
+            for _ in range(size):
+                yield t
+                t += self.burst_gap
+            t += int(self.min_gap * rng.paretovariate(self.alpha))
+
+
+class UniformExecTimes:
+    """Execution times drawn uniformly from [min_time, max_time]
+    """
+
+    def __init__(self, min_time: int = 1, max_time: int = 10):
+        self.min_time = min_time
+        self.max_time = max_time
+
+    def __call__(self, rng: random.Random) -> int:
+        return rng.randint(self.min_time, self.max_time)
+
+
+class ExponentialExecTimes:
+    """Exponentially distributed execution times, at least 1 and at most `max_time`
+    """
+
+    def __init__(self, mean: float = 5.0, max_time: int = 100):
+        self.mean = mean
+        self.max_time = max_time
+
+    def __call__(self, rng: random.Random) -> int:
+        return min(max(1, round(rng.expovariate(1 / self.mean))), self.max_time)
+
+
+class ParetoExecTimes:
+    """Heavy-tailed execution times, mostly short jobs with a few long ones
+    """
+
+    def __init__(self, alpha: float = 1.5, min_time: int = 1, max_time: int = 1000):
+        """
+        :param alpha: Pareto shape, lower is heavier tailed
+        :type alpha: float
+        """
+        self.alpha = alpha
+        self.min_time = min_time
+        self.max_time = max_time
+
+    def __call__(self, rng: random.Random) -> int:
+        return min(int(self.min_time * rng.paretovariate(self.alpha)), self.max_time)
+
+
+class Workload:
+    """Process workload of an arrival process and an execution time distribution
+    """
+
+    def __init__(self, arrivals: Callable[[random.Random], Iterator[int]], exec_times: Callable[[random.Random], int]):
+        """
+        :param arrivals: Function of a random number generator returning an
+            endless iterator of non-decreasing arrival times
+        :type arrivals: Callable[[random.Random], Iterator[int]]
+
+        :param exec_times: Function of a random number generator returning an
+            execution time
+        :type exec_times: Callable[[random.Random], int]
+        """
+        self.arrivals = arrivals
+        self.exec_times = exec_times
+
+    def stream(self, n_processes: int, rng: random.Random = None) -> Iterator[Tuple[int, int]]:
+        """Streams (arrival time, execution time) pairs in arrival order
+
+        Uses O(1) memory, so problems of any size can be generated without
+        sampling from or sorting over a range of times.
+
+        :param rng: Random number generator to draw from. Defaults to the global one.
+        :type rng: random.Random
+        """
+        if rng == None:
+            rng = random
+
+        for arrival_t in itertools.islice(self.arrivals(rng), n_processes):
+            yield arrival_t, self.exec_times(rng)
+
+
+# Named workloads for command line tools
+WORKLOADS: Dict[str, Workload] = {
+    'poisson': Workload(ExponentialArrivals(mean_gap=2.0), ExponentialExecTimes(mean=5.0)),
+    'bursty': Workload(BurstyArrivals(), ParetoExecTimes(max_time=200)),
+}